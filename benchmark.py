@@ -0,0 +1,325 @@
+from bot import (
+    AccountScheduler, LoopLagMonitor, RedactedAirways, configure_logging, configure_runtime, logger, run_async
+)
+from mock_server import MockQuestServer, make_token
+import argparse, asyncio, json, logging, os, shutil, statistics, subprocess, sys, tempfile, time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def percentile(values, percent):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))]
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def write_tokens(path, usernames, token_ttl):
+    with open(path, 'w') as file:
+        for username in usernames:
+            file.write(make_token(username, token_ttl) + "\n")
+
+def served(server, bot):
+    return server.requests if server else sum(bot.cassette.responses.values())
+
+async def run_benchmark(args):
+    """
+    Runs `args.cycles` passes of process_accounts for synthetic accounts
+    against a local MockQuestServer, or for the accounts of a recorded
+    cassette without any network, and returns one report per cycle
+    """
+    server = None if args.cassette else MockQuestServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        unauthorized_rate=args.unauthorized_rate,
+        rate_limited_rate=args.rate_limited_rate,
+        retry_after=args.retry_after,
+        tasks=args.tasks,
+        partners=args.partners,
+        seed=args.seed
+    )
+    base_url = await server.start() if server else "http://replay.invalid"
+    workdir = tempfile.mkdtemp(prefix="redacted-bench-")
+
+    bot = RedactedAirways(
+        concurrency=args.concurrency,
+        account_concurrency=args.account_concurrency,
+        rate_limit=args.rate_limit,
+        burst=args.burst,
+        base_url=base_url,
+        replay=args.cassette,
+        replay_speed=args.replay_speed,
+        profile=args.profile
+    )
+    bot.retry_policy.base_delay = args.retry_delay
+    bot.token_store.path = os.path.join(workdir, "data.txt")
+    bot.journal.path = os.path.join(workdir, "checkpoint.jsonl")
+    if bot.cassette is not None:
+        usernames = bot.cassette.load().accounts()
+    else:
+        usernames = [f"bench{index:06d}" for index in range(args.accounts)]
+    write_tokens(bot.token_store.path, usernames, args.token_ttl)
+    bot.token_store.load()
+
+    latencies = []
+    request = bot.request
+
+    async def timed_request(*request_args, **request_kwargs):
+        started = time.perf_counter()
+        try:
+            return await request(*request_args, **request_kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    bot.request = timed_request
+    loop_lag = LoopLagMonitor(interval=0.01)
+    loop_lag_task = asyncio.create_task(loop_lag.run())
+    if bot.profiler is not None:
+        bot.profiler.loop_lag = loop_lag
+
+    reports = []
+    try:
+        for cycle in range(1, args.cycles + 1):
+            latencies.clear()
+            loop_lag.reset()
+            requests_before = served(server, bot)
+            scheduler = AccountScheduler(
+                lambda token, username: bot.process_accounts(token, username, False),
+                concurrency=args.concurrency,
+                metrics=bot.metrics
+            )
+            if bot.profiler is not None:
+                bot.profiler.start(len(bot.token_store))
+            started = time.perf_counter()
+            results = await scheduler.run(bot.token_store.accounts())
+            elapsed = time.perf_counter() - started
+            requests = served(server, bot) - requests_before
+            lag = loop_lag.stats()
+            phases = bot.profiler.end_cycle()["phases"] if bot.profiler is not None else None
+            reports.append({
+                "cycle": cycle,
+                "accounts": len(results),
+                "succeeded": sum(1 for result in results.values() if result),
+                "elapsed_s": round(elapsed, 3),
+                "accounts_per_min": round(len(results) / elapsed * 60, 1) if elapsed else 0.0,
+                "requests": requests,
+                "requests_per_s": round(requests / elapsed, 1) if elapsed else 0.0,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+                "peak_memory_mb": round(peak_memory_mb(), 1) if resource else None,
+                "loop_lag_p99_ms": lag["p99_ms"],
+                "loop_lag_max_ms": lag["max_ms"],
+                "phases": phases,
+            })
+    finally:
+        loop_lag_task.cancel()
+        await bot.token_store.close()
+        await bot.journal.close()
+        await bot.sessions.close()
+        if server is not None:
+            await server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    responses = server.responses if server else bot.cassette.responses
+    return {"responses": responses, "cycles": reports}
+
+STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import bot
+imported = time.perf_counter()
+instance = bot.RedactedAirways(interactive=False)
+constructed = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "init_ms": (constructed - imported) * 1000,
+    "modules": sorted(name for name in ("rich", "fake_useragent", "aiohttp_socks", "aiohttp.web") if name in sys.modules)
+}))
+"""
+
+def startup_benchmark(runs):
+    """
+    Median cold start of a headless bot over `runs` fresh interpreters:
+    the whole process, importing bot and constructing RedactedAirways
+    """
+    samples = []
+    root = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-c", STARTUP_SCRIPT], cwd=root, capture_output=True, text=True, check=True
+        ).stdout
+        sample = json.loads(output)
+        sample["process_ms"] = (time.perf_counter() - started) * 1000
+        samples.append(sample)
+    report = {
+        key: round(statistics.median(sample[key] for sample in samples), 1)
+        for key in ("process_ms", "import_ms", "init_ms")
+    }
+    report["runs"] = runs
+    report["optional_modules_loaded"] = samples[-1]["modules"]
+    return report
+
+def run_profile(args, runtime, logging_mode="quiet"):
+    """
+    Runs the benchmark on the event loop and JSON decoder of `runtime`.
+    Unless `logging_mode` is 'quiet' the bot logs at INFO level to
+    /dev/null, either on the event loop ('inline') or through the
+    background log pipeline ('background').
+    """
+    backends = configure_runtime(runtime)
+    with open(os.devnull, 'w') as devnull:
+        if logging_mode != "quiet":
+            configure_logging(args.log_format, stream=devnull, background=logging_mode == "background")
+            logger.setLevel(logging.INFO)
+        try:
+            report = run_async(run_benchmark(args), runtime)
+        finally:
+            if logging_mode != "quiet":
+                configure_logging("plain", background=False)
+                logger.setLevel(logging.NOTSET if args.verbose else logging.WARNING)
+    report["runtime"] = backends
+    report["logging"] = logging_mode
+    return report
+
+def speedup(fast, stdlib):
+    """
+    Relative gain of the fast runtime over the stdlib one per cycle
+    """
+    return [
+        {
+            "cycle": current["cycle"],
+            "accounts_per_min": round(current["accounts_per_min"] / previous["accounts_per_min"], 2)
+            if previous["accounts_per_min"] else None,
+            "p50_ms": round(previous["p50_ms"] / current["p50_ms"], 2) if current["p50_ms"] else None,
+        }
+        for current, previous in zip(fast["cycles"], stdlib["cycles"])
+    ]
+
+def compare(report, baseline, tolerance):
+    """
+    Returns a list of regressions of the first cycle against a saved baseline
+    """
+    current, previous = report["cycles"][0], baseline["cycles"][0]
+    regressions = []
+    for key in ("accounts_per_min", "requests_per_s"):
+        if current[key] < previous[key] * (1 - tolerance):
+            regressions.append(f"{key}: {current[key]} < {previous[key]}")
+    for key in ("p50_ms", "p99_ms"):
+        if current[key] > previous[key] * (1 + tolerance):
+            regressions.append(f"{key}: {current[key]} > {previous[key]}")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput benchmark against the local mock Quest API")
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--cycles", type=int, default=2, help="later cycles find every task already finished")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--account-concurrency", type=int, default=4)
+    parser.add_argument("--rate-limit", type=float, default=1000.0)
+    parser.add_argument("--burst", type=int, default=200)
+    parser.add_argument("--retry-delay", type=float, default=0.05, help="base backoff delay in seconds")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limited-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--partners", type=int, default=5)
+    parser.add_argument("--token-ttl", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--runtime", choices=["fast", "stdlib", "both"], default="fast",
+                        help="'both' runs the stdlib and the fast runtime and reports the speedup")
+    parser.add_argument("--logging", choices=["quiet", "inline", "background", "both"], default="quiet",
+                        help="log at INFO level on the event loop, through the background pipeline, or both in turn")
+    parser.add_argument("--log-format", choices=["rich", "plain", "json"], default="rich",
+                        help="formatter used with --logging")
+    parser.add_argument("--startup", type=int, metavar="RUNS",
+                        help="measure cold start over RUNS fresh interpreters instead of throughput")
+    parser.add_argument("--cassette", help="replay this recorded cassette instead of starting the mock server")
+    parser.add_argument("--replay-speed", type=float, default=0.0,
+                        help="cassette latency divisor: 1 is real time, 0 instant")
+    parser.add_argument("--profile", metavar="REPORT", help="append per-cycle phase timings to this .jsonl report")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--save", help="write the report to this file")
+    parser.add_argument("--baseline", help="compare against a report saved with --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--verbose", action="store_true", help="keep the bot's per-task logging")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_logging("plain", background=False)
+    if not args.verbose:
+        logger.setLevel(logging.WARNING)
+
+    if args.startup:
+        report = startup_benchmark(args.startup)
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(
+                f"startup over {report['runs']} runs: process {report['process_ms']}ms | "
+                f"import {report['import_ms']}ms | init {report['init_ms']}ms | "
+                f"optional modules loaded: {', '.join(report['optional_modules_loaded']) or 'none'}"
+            )
+        return 0
+
+    logging_mode = "background" if args.logging == "both" else args.logging
+    if args.runtime == "both":
+        stdlib = run_profile(args, "stdlib", logging_mode)
+        report = run_profile(args, "fast", logging_mode)
+        report["baseline_runtime"] = stdlib
+        report["speedup"] = speedup(report, stdlib)
+    else:
+        report = run_profile(args, args.runtime, logging_mode)
+    if args.logging == "both":
+        report["baseline_logging"] = run_profile(args, "stdlib" if args.runtime == "both" else args.runtime, "inline")
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for profile in (report.get("baseline_runtime"), report.get("baseline_logging"), report):
+            if profile is None:
+                continue
+            runtime = profile["runtime"]
+            print(f"runtime: {runtime['loop']} event loop, {runtime['json']} decoder, logging {profile['logging']}")
+            for cycle in profile["cycles"]:
+                print(
+                    f"  cycle {cycle['cycle']}: {cycle['succeeded']}/{cycle['accounts']} accounts in {cycle['elapsed_s']}s | "
+                    f"{cycle['accounts_per_min']} accounts/min | {cycle['requests_per_s']} req/s | "
+                    f"p50 {cycle['p50_ms']}ms p99 {cycle['p99_ms']}ms | peak {cycle['peak_memory_mb']}MB | "
+                    f"loop lag p99 {cycle['loop_lag_p99_ms']}ms max {cycle['loop_lag_max_ms']}ms"
+                )
+                if cycle.get("phases"):
+                    print("    phases: " + ", ".join(
+                        f"{name} {phase['total_s']}s/{phase['count']}" for name, phase in cycle["phases"].items()
+                    ))
+            print(f"  responses by status: {profile['responses']}")
+        for gain in report.get("speedup", []):
+            print(f"speedup cycle {gain['cycle']}: {gain['accounts_per_min']}x accounts/min, {gain['p50_ms']}x p50")
+
+    if args.save:
+        with open(args.save, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        if regressions:
+            print("Performance regressions:\n  " + "\n  ".join(regressions))
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,56 +1,2124 @@
 from aiohttp import (
+    ClientConnectionError,
+    ClientPayloadError,
     ClientResponseError,
     ClientSession,
-    ClientTimeout
-)
-from datetime import datetime
-from fake_useragent import FakeUserAgent
-import asyncio, base64, json, os, pytz
-from aiohttp_socks import ProxyConnector
-from concurrent.futures import ThreadPoolExecutor
-from rich.console import Console
-from rich.logging import RichHandler
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
-from rich.table import Table
-import logging
-from rich.theme import Theme
-from rich.style import Style
-
-# Configure Rich Console with custom theme
-custom_theme = Theme({
-    "info": "cyan",
-    "warning": "yellow",
-    "error": "red",
-    "success": "green"
-})
-console = Console(theme=custom_theme)
-
-# Configure logging with RichHandler
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(console=console, rich_tracebacks=True)]
+    ClientTimeout,
+    RequestInfo,
+    TCPConnector
 )
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from yarl import URL
+import argparse, asyncio, atexit, base64, gzip, heapq, itertools, json, multiprocessing, os, queue, random, tempfile, threading, time, zlib
+import logging, logging.handlers
+
+# Rich, fake_useragent and aiohttp_socks are imported on first use: headless
+# runs without proxies never load them
+aiohttp_socks = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+console = None
+
+def get_console():
+    """
+    Shared Rich console with the custom theme, created on first use
+    """
+    global console
+    if console is None:
+        from rich.console import Console
+        from rich.theme import Theme
+        console = Console(theme=Theme({
+            "info": "cyan",
+            "warning": "yellow",
+            "error": "red",
+            "success": "green"
+        }))
+    return console
+
+def load_socks():
+    """
+    Imports aiohttp_socks the first time a proxy is used and registers its
+    errors as retryable
+    """
+    global aiohttp_socks
+    if aiohttp_socks is None:
+        import aiohttp_socks as module
+        aiohttp_socks = module
+        RetryPolicy.RETRYABLE_ERRORS += (module.ProxyConnectionError, module.ProxyError, module.ProxyTimeoutError)
+    return aiohttp_socks
+
 logger = logging.getLogger("RedactedAirways")
 
-wib = pytz.timezone('Asia/Jakarta')
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as one JSON object per line
+    """
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class RepeatLimiter:
+    """
+    Lets through at most `limit` identical messages per `interval` seconds
+
+    Only records below WARNING are limited, so no failure is ever
+    dropped. The number of dropped repeats is appended to the first message let
+    through in the next window, or reported on its own once the window
+    expires.
+    """
+    def __init__(self, limit=5, interval=10.0):
+        self.limit = limit
+        self.interval = interval
+        self.windows = {}
+        self.last_prune = 0.0
+
+    def allow(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        window = self.windows.get(key)
+        if window is None or record.created - window[0] >= self.interval:
+            if window is not None and window[2]:
+                record.msg = f"{record.getMessage()} ({window[2]} repeats suppressed)"
+                record.args = None
+            self.windows[key] = [record.created, 1, 0]
+            return True
+        if window[1] < self.limit:
+            window[1] += 1
+            return True
+        window[2] += 1
+        return False
+
+    def expired(self, now=None, force=False):
+        """
+        Drops finished windows, returning summary records for the ones
+        that suppressed messages
+        """
+        now = time.time() if now is None else now
+        if not force and now - self.last_prune < self.interval:
+            return []
+        self.last_prune = now
+        summaries = []
+        for key, window in list(self.windows.items()):
+            if force or now - window[0] >= self.interval:
+                del self.windows[key]
+                if window[2]:
+                    name, level, message = key
+                    summaries.append(logging.makeLogRecord({
+                        "name": name, "levelno": level, "levelname": logging.getLevelName(level),
+                        "msg": f"{message} ({window[2]} repeats suppressed)", "created": now
+                    }))
+        return summaries
+
+class LogPipeline:
+    """
+    Writes log records on a background thread instead of the event loop
+
+    Records arrive through a QueueHandler, are drained in batches of up to
+    `batch_size`, pass a RepeatLimiter and are handed to the real handlers.
+    Stream and file handlers get one write and one flush per batch.
+    """
+    def __init__(self, handlers, batch_size=500, repeat_limit=5, repeat_interval=10.0):
+        self.handlers = handlers
+        self.batch_size = batch_size
+        self.limiter = RepeatLimiter(repeat_limit, repeat_interval)
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="log-writer", daemon=True)
+        self.thread.start()
+        return self
+
+    def run(self):
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = batch[:batch.index(None)]
+            self.write([record for record in batch if self.limiter.allow(record)] + self.limiter.expired())
+        self.write(self.limiter.expired(force=True))
+
+    def write(self, records):
+        if not records:
+            return
+        for handler in self.handlers:
+            records_for_handler = [
+                record for record in records if record.levelno >= handler.level and handler.filter(record)
+            ]
+            if not records_for_handler:
+                continue
+            if not isinstance(handler, logging.StreamHandler):
+                for record in records_for_handler:
+                    handler.handle(record)
+                continue
+            handler.acquire()
+            try:
+                handler.stream.write("".join(handler.format(record) + handler.terminator for record in records_for_handler))
+                handler.flush()
+            except Exception:
+                handler.handleError(records_for_handler[0])
+            finally:
+                handler.release()
+
+    def stop(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(timeout=5)
+            self.thread = None
+        for handler in self.handlers:
+            handler.close()
+
+log_pipeline = None
+
+def configure_logging(log_format="rich", level=logging.INFO, log_file=None, background=True, stream=None):
+    """
+    Replaces the root handler: 'rich' for the terminal UI, 'plain' or
+    'json' for structured logs under a supervisor, plus JSON lines appended
+    to `log_file` if given. With `background` the output is written by a
+    LogPipeline thread, so the event loop only enqueues records.
+    """
+    global log_pipeline
+    if log_format == "rich":
+        from rich.logging import RichHandler
+        if stream is None:
+            target = get_console()
+        else:
+            from rich.console import Console
+            target = Console(file=stream)
+        handler = RichHandler(console=target, rich_tracebacks=True)
+        handler.setFormatter(logging.Formatter("%(message)s", datefmt="[%X]"))
+    else:
+        handler = logging.StreamHandler(stream)
+        if log_format == "json":
+            handler.setFormatter(JsonFormatter())
+        else:
+            handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    handlers = [handler]
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        handlers.append(file_handler)
+
+    if log_pipeline is not None:
+        log_pipeline.stop()
+        log_pipeline = None
+    root = logging.getLogger()
+    if background:
+        log_pipeline = LogPipeline(handlers).start()
+        atexit.register(log_pipeline.stop)
+        root.handlers = [logging.handlers.QueueHandler(log_pipeline.queue)]
+    else:
+        root.handlers = handlers
+    root.setLevel(level)
+    return log_pipeline
+
+json_loads = json.loads
+
+def runtime_backends(runtime="fast"):
+    """
+    Returns the event loop and JSON decoder used for `runtime`: 'fast'
+    picks uvloop and orjson when they are installed, 'stdlib' never does
+    """
+    fast = runtime == "fast"
+    return {
+        "loop": "uvloop" if fast and uvloop else "asyncio",
+        "json": "orjson" if fast and orjson else "json"
+    }
+
+def configure_runtime(runtime="fast"):
+    """
+    Selects the JSON decoder for API bodies and token payloads and returns
+    the active backends
+    """
+    global json_loads
+    backends = runtime_backends(runtime)
+    json_loads = orjson.loads if backends["json"] == "orjson" else json.loads
+    return backends
+
+def run_async(main, runtime="fast"):
+    """
+    asyncio.run on the event loop selected by `runtime`
+
+    asyncio.Runner only exists on Python 3.11+; older interpreters get
+    uvloop through a temporary event loop policy instead.
+    """
+    if runtime_backends(runtime)["loop"] != "uvloop":
+        return asyncio.run(main)
+    if hasattr(asyncio, "Runner"):
+        with asyncio.Runner(loop_factory=uvloop.new_event_loop) as runner:
+            return runner.run(main)
+    policy = asyncio.get_event_loop_policy()
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    try:
+        return asyncio.run(main)
+    finally:
+        asyncio.set_event_loop_policy(policy)
+
+wib = timezone(timedelta(hours=7), "WIB")
+
+base_headers = None
+
+def user_agent(path=".user_agent", max_age=24 * 60 * 60):
+    """
+    A random browser User-Agent, cached in `path` for `max_age` seconds so
+    restarts skip loading the fake_useragent database
+    """
+    try:
+        if time.time() - os.path.getmtime(path) < max_age:
+            with open(path, 'r') as file:
+                agent = file.read().strip()
+            if agent:
+                return agent
+    except OSError:
+        pass
+    from fake_useragent import FakeUserAgent
+    agent = FakeUserAgent().random
+    try:
+        write_atomic(path, agent)
+    except OSError as e:
+        logger.debug(f"Could not cache the User-Agent: {e}")
+    return agent
+
+def get_base_headers():
+    """
+    Request headers shared by every account, built once per process
+    """
+    global base_headers
+    if base_headers is None:
+        base_headers = {
+            'Accept': '*/*',
+            'Accept-Language': 'id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7',
+            'Referer': 'https://quest.redactedairways.com/home',
+            'Sec-Fetch-Dest': 'empty',
+            'Sec-Fetch-Mode': 'cors',
+            'Sec-Fetch-Site': 'same-origin',
+            'User-Agent': user_agent()
+        }
+    return base_headers
+
+def format_seconds(seconds):
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}"
+
+def shard_of(username, count):
+    """
+    Index of the worker shard an account belongs to out of `count`
+    """
+    return zlib.crc32(username.encode()) % count
+
+def endpoint_for(url: str):
+    """
+    Returns a stable endpoint name for a URL, e.g. 'task/claim' for
+    '/api/v1/task/claim/<id>'
+    """
+    path = urlsplit(url).path.strip("/")
+    if path.startswith("api/v1/"):
+        path = path[len("api/v1/"):]
+    parts = path.split("/")
+    if len(parts) > 2:
+        parts = parts[:2]
+    return "/".join(parts)
+
+class SessionManager:
+    """
+    Keeps one pooled, keep-alive ClientSession per (proxy, account) pair
+
+    Sessions are created lazily on first use and reused for every request of
+    that account, so TCP/TLS (and proxy) handshakes are paid once per run
+    instead of once per request.
+    """
+    def __init__(self, limit_per_host=4, ttl_dns_cache=300, keepalive_timeout=60, timeout=30):
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.sessions = {}
+
+    def create_connector(self, proxy=None):
+        options = {
+            "limit_per_host": self.limit_per_host,
+            "ttl_dns_cache": self.ttl_dns_cache,
+            "keepalive_timeout": self.keepalive_timeout,
+        }
+        if proxy:
+            return load_socks().ProxyConnector.from_url(proxy, **options)
+        return TCPConnector(**options)
+
+    def get(self, proxy=None, account=None):
+        key = (proxy, account)
+        session = self.sessions.get(key)
+        if session is None or session.closed:
+            session = ClientSession(
+                connector=self.create_connector(proxy),
+                timeout=ClientTimeout(total=self.timeout)
+            )
+            self.sessions[key] = session
+        return session
+
+    async def release(self, account):
+        """
+        Closes every session that belongs to the given account
+        """
+        keys = [key for key in self.sessions if key[1] == account]
+        for key in keys:
+            session = self.sessions.pop(key)
+            if not session.closed:
+                await session.close()
+
+    async def close(self):
+        sessions = list(self.sessions.values())
+        self.sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+
+class RetryPolicy:
+    """
+    Classifies request errors and computes backoff delays between attempts
+
+    Client errors that can never succeed (400, 403, 404, ...) are not
+    retried. Transient failures back off exponentially with full jitter,
+    and a server supplied Retry-After header takes precedence.
+    """
+    RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+    RETRYABLE_ERRORS = (
+        asyncio.TimeoutError,
+        ClientConnectionError,
+        ClientPayloadError
+    )
+
+    def __init__(self, base_delay=1.0, max_delay=30.0, max_retry_after=120.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def is_retryable(self, error):
+        if isinstance(error, ClientResponseError):
+            return error.status in self.RETRYABLE_STATUSES
+        return isinstance(error, self.RETRYABLE_ERRORS)
+
+    def retry_after(self, error):
+        headers = getattr(error, "headers", None)
+        value = headers.get("Retry-After") if headers else None
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def delay(self, attempt, error=None):
+        retry_after = self.retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+class TokenBucket:
+    """
+    Async token bucket refilled at `rate` tokens per second up to `burst`
+
+    Waiters are served in arrival order, so the aggregate request rate of
+    every caller sharing the bucket never exceeds the configured ceiling.
+    """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class RateLimiter:
+    """
+    Shared rate limiter with one token bucket per host and optional
+    per-endpoint buckets
+
+    Parameters:
+    - rate: Requests per second allowed for each host
+    - burst: Bucket capacity for each host
+    - endpoint_limits: Optional mapping of endpoint name (see endpoint_for)
+      to a (rate, burst) tuple, applied on top of the host limit
+    """
+    def __init__(self, rate=10.0, burst=20, endpoint_limits=None):
+        self.rate = rate
+        self.burst = burst
+        self.endpoint_limits = endpoint_limits or {}
+        self.buckets = {}
+
+    def bucket(self, key, rate, burst):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, url: str):
+        host = urlsplit(url).netloc
+        endpoint = endpoint_for(url)
+        if endpoint in self.endpoint_limits:
+            rate, burst = self.endpoint_limits[endpoint]
+            await self.bucket((host, endpoint), rate, burst).acquire()
+        await self.bucket(host, self.rate, self.burst).acquire()
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request while a circuit breaker is open
+
+    `proxy` is the proxy URL when the open breaker is a proxy's.
+    """
+    def __init__(self, key, retry_in, proxy=None):
+        super().__init__(f"Circuit open for {key}, retry in {retry_in:.0f}s")
+        self.key = key
+        self.retry_in = retry_in
+        self.proxy = proxy
+
+class CircuitBreaker:
+    """
+    Fails fast for one target (an endpoint or a proxy) after repeated failures
+
+    Closed: requests pass and consecutive failures are counted. After
+    `failure_threshold` of them the breaker opens and rejects requests for
+    `reset_timeout` seconds, doubling up to `max_reset_timeout` while the
+    target stays down. It then turns half-open: a single probe request goes
+    through, and its outcome closes or re-opens the breaker.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, key, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=300.0):
+        self.key = key
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.timeout = reset_timeout
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+
+    def retry_in(self):
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.timeout - time.monotonic()
+        else:
+            remaining = self.probe_started + self.reset_timeout - time.monotonic()
+        return max(1.0, remaining)
+
+    def ready(self):
+        """
+        True if allow() would let a request through, without taking the
+        half-open probe slot
+        """
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            return now >= self.opened_at + self.timeout
+        # Half-open lets one probe through; a probe that never reported
+        # back is replaced after reset_timeout
+        return now - self.probe_started > self.reset_timeout
+
+    def allow(self):
+        if not self.ready():
+            return False
+        if self.state != self.CLOSED:
+            self.state = self.HALF_OPEN
+            self.probe_started = time.monotonic()
+        return True
+
+    def release(self):
+        """
+        Hands back a probe that ended without saying anything about this
+        target, so the next request can probe right away
+        """
+        if self.state == self.HALF_OPEN:
+            self.probe_started = 0.0
+
+    def record_success(self):
+        """
+        Returns True if this closed a breaker that was not closed
+        """
+        recovered = self.state != self.CLOSED
+        self.state = self.CLOSED
+        self.failures = 0
+        self.timeout = self.reset_timeout
+        return recovered
+
+    def record_failure(self):
+        """
+        Returns True if this failure opened the breaker
+        """
+        if self.state == self.HALF_OPEN:
+            self.timeout = min(self.timeout * 2, self.max_reset_timeout)
+        else:
+            self.failures += 1
+            if self.state == self.OPEN or self.failures < self.failure_threshold:
+                return False
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        return True
+
+class CircuitBreakers:
+    """
+    Circuit breakers keyed by endpoint name and by proxy URL
+
+    HTTP 5xx responses count against the endpoint. Connection errors and
+    timeouts count against the proxy, or against the endpoint when no
+    proxy is used. Any other outcome means the target answered.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, max_reset_timeout=300.0, metrics=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.metrics = metrics
+        self.breakers = {}
+
+    def get(self, key):
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            breaker = self.breakers[key] = CircuitBreaker(
+                key, self.failure_threshold, self.reset_timeout, self.max_reset_timeout
+            )
+        return breaker
+
+    def check(self, endpoint, proxy=None):
+        """
+        Raises CircuitOpenError if the endpoint or the proxy is open
+
+        Probe slots of half-open breakers are only taken once every breaker
+        lets the request through, so a probe is never spent on a request
+        that is not sent.
+        """
+        breakers = [self.get(key) for key in (endpoint, proxy) if key is not None]
+        for breaker in breakers:
+            if not breaker.ready():
+                raise CircuitOpenError(
+                    self.label(breaker.key), breaker.retry_in(), breaker.key if breaker.key == proxy else None
+                )
+        for breaker in breakers:
+            breaker.allow()
+
+    def label(self, key):
+        return Metrics.proxy_label(key) if "://" in key else key
+
+    def outcome(self, key, failed):
+        breaker = self.get(key)
+        if failed:
+            if breaker.record_failure():
+                logger.warning(f"Circuit opened for {self.label(key)} for {breaker.timeout:.0f}s")
+                if self.metrics is not None:
+                    self.metrics.inc("circuit_opened_total", target=self.label(key))
+        elif breaker.record_success():
+            logger.info(f"Circuit closed for {self.label(key)}")
+
+    def record(self, endpoint, proxy=None, error=None):
+        if isinstance(error, ClientResponseError):
+            self.outcome(endpoint, error.status >= 500)
+        elif isinstance(error, RetryPolicy.RETRYABLE_ERRORS):
+            self.outcome(proxy or endpoint, True)
+            if proxy:
+                # The endpoint was never reached; free its probe for others
+                self.get(endpoint).release()
+            return
+        else:
+            self.outcome(endpoint, False)
+        if proxy:
+            self.outcome(proxy, False)
+
+def write_atomic(path, content):
+    """
+    Writes content (a string or an iterable of strings) to a temp file next
+    to `path` and renames it into place
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as file:
+            if isinstance(content, str):
+                file.write(content)
+            else:
+                file.writelines(content)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+class BufferedFile:
+    """
+    Base for in-memory state that is persisted with coalesced atomic writes
+
+    Subclasses call mark_dirty() after changing their state and implement
+    render(). Changes are written back after `flush_delay` seconds as a
+    single atomic temp file + rename, so a burst of updates costs one write.
+    With `path` set to None the state is kept in memory only.
+    """
+    def __init__(self, path, flush_delay=2.0):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.dirty = False
+        self.flush_task = None
+        self.lock = None
+
+    def render(self):
+        raise NotImplementedError
+
+    def write(self, content):
+        write_atomic(self.path, content)
+
+    def mark_dirty(self):
+        self.dirty = True
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.ensure_future(self.delayed_flush())
+
+    async def delayed_flush(self):
+        while self.dirty:
+            await asyncio.sleep(self.flush_delay)
+            await self.flush()
+
+    async def flush(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+            if self.path is None:
+                return
+            content = self.render()
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, self.write, content)
+            except Exception:
+                self.dirty = True
+                raise
+
+    async def close(self):
+        if self.flush_task is not None and not self.flush_task.done():
+            self.flush_task.cancel()
+        await self.flush()
+
+class TokenStore(BufferedFile):
+    """
+    Streams accounts from data.txt and keeps only refreshed tokens in memory
+
+    Tokens are read and decoded lazily on every pass, so memory does not
+    grow with the size of the file. Refreshed tokens are written back in one
+    coalesced atomic rewrite, so concurrent refreshes never race on the
+    file. Lines that cannot be decoded are kept as-is, and duplicate
+    accounts keep their first line. With `shard` set to (index, count) only
+    the accounts hashed to that shard are yielded.
+    """
+    def __init__(self, decode, path='data.txt', flush_delay=2.0):
+        super().__init__(path, flush_delay)
+        self.decode = decode
+        self.source = path
+        self.shard = None
+        self.updates = {}
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def load(self, path=None):
+        """
+        Counts the accounts of a data.txt style file (one token per line);
+        the tokens themselves are read on demand
+        """
+        self.source = path or self.path
+        self.count = sum(1 for _ in self.accounts())
+        return self
+
+    def tokens(self):
+        with open(self.source, 'r') as file:
+            for line in file:
+                token = line.strip()
+                if token:
+                    yield token
+
+    def render(self):
+        return dict(self.updates)
+
+    def rendered_lines(self, updates):
+        missing = set(updates)
+        for token in self.tokens():
+            username = self.decode(token)
+            missing.discard(username)
+            yield updates.get(username, token) + "\n"
+        for username in missing:
+            yield updates[username] + "\n"
+
+    def write(self, updates):
+        write_atomic(self.path, self.rendered_lines(updates))
+
+    def export(self, path):
+        """
+        Writes the current tokens to a data.txt style file
+        """
+        write_atomic(path, self.rendered_lines(self.updates))
+
+    def get(self, username, default=None):
+        return self.updates.get(username, default)
+
+    async def resolve(self, usernames):
+        """
+        Current tokens of `usernames` as {username: token}, reading the file
+        once off the event loop for the ones that were not refreshed
+        """
+        found = {username: self.updates[username] for username in usernames if username in self.updates}
+        missing = set(usernames) - set(found)
+        if missing:
+            found.update(await asyncio.get_running_loop().run_in_executor(None, self.find, missing))
+        return found
+
+    def find(self, usernames):
+        found = {}
+        for token in self.tokens():
+            username = self.decode(token)
+            if username in usernames and username not in found:
+                found[username] = token
+                if len(found) == len(usernames):
+                    break
+        return found
+
+    def accounts(self):
+        """
+        Yields (token, username) for every decodable account in file order
+        """
+        seen = set()
+        for token in self.tokens():
+            username = self.decode(token)
+            if not username or username in seen:
+                continue
+            seen.add(username)
+            if self.shard is not None and shard_of(username, self.shard[1]) != self.shard[0]:
+                continue
+            yield self.updates.get(username, token), username
+
+    def update(self, username, token):
+        if self.updates.get(username) == token:
+            return
+        self.updates[username] = token
+        self.mark_dirty()
+
+class AppendOnlyFile(BufferedFile):
+    """
+    Base for state persisted as an append-only log of JSON array lines
+
+    New entries are appended in coalesced batches, so a flush never
+    serializes the whole state. Once the file holds `compact_ratio` times
+    more lines than live entries it is compacted: rewritten atomically from
+    snapshot(). Subclasses implement reset(), apply(), live_entries() and
+    snapshot(). `on_append`, if set, is called with every new entry.
+    """
+    NAME = "state file"
+
+    def __init__(self, path, flush_delay=2.0, compact_ratio=4):
+        super().__init__(path, flush_delay)
+        self.compact_ratio = compact_ratio
+        self.pending = []
+        self.lines_on_disk = 0
+        self.compact_next = False
+        self.on_append = None
+
+    def load(self):
+        self.reset()
+        self.lines_on_disk = 0
+        if self.path is None:
+            return self
+        try:
+            with open(self.path, 'r') as file:
+                for line in file:
+                    self.lines_on_disk += 1
+                    try:
+                        self.apply(json.loads(line))
+                    except (ValueError, TypeError, IndexError):
+                        # A torn last line from a crash mid-append
+                        self.compact_next = True
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Ignoring unreadable {self.NAME}: {e}")
+        self.evict()
+        return self
+
+    def reset(self):
+        raise NotImplementedError
+
+    def apply(self, entry):
+        raise NotImplementedError
+
+    def live_entries(self):
+        raise NotImplementedError
+
+    def snapshot(self):
+        raise NotImplementedError
+
+    def evict(self):
+        pass
+
+    def append(self, *entry):
+        self.apply(entry)
+        if self.on_append is not None:
+            self.on_append(entry)
+        if self.path is not None:
+            self.pending.append(json.dumps(entry, separators=(",", ":")) + "\n")
+            self.mark_dirty()
+
+    def render(self):
+        lines, self.pending = self.pending, []
+        live = self.live_entries()
+        if self.compact_next or self.lines_on_disk + len(lines) > max(1000, live * self.compact_ratio):
+            self.evict()
+            self.compact_next = False
+            lines = [json.dumps(entry, separators=(",", ":")) + "\n" for entry in self.snapshot()]
+            self.lines_on_disk = len(lines)
+            return True, "".join(lines)
+        self.lines_on_disk += len(lines)
+        return False, "".join(lines)
+
+    def write(self, content):
+        compact, text = content
+        if compact:
+            write_atomic(self.path, text)
+        elif text:
+            with open(self.path, 'a') as file:
+                file.write(text)
+
+    async def flush(self):
+        try:
+            await super().flush()
+        except Exception:
+            # The failed batch is gone from `pending`; rewrite from memory
+            self.compact_next = True
+            raise
+
+class CheckpointJournal(AppendOnlyFile):
+    """
+    Append-only record of progress within a cycle, so a restarted bot
+    resumes where it stopped
+
+    Each line is a JSON array: ["claimed", account, task_id, timestamp],
+    ["completed", account, task_id], ["released", account, task_id] or
+    ["finished", account, timestamp, ok]. Claimed and finished entries
+    older than `ttl` are dropped when the file is compacted.
+    """
+    NAME = "checkpoint journal"
+
+    def __init__(self, path='checkpoint.jsonl', ttl=12 * 60 * 60, flush_delay=1.0, compact_ratio=4):
+        super().__init__(path, flush_delay, compact_ratio)
+        self.ttl = ttl
+        self.claimed = {}
+        self.finished_at = {}
+
+    def reset(self):
+        self.claimed = {}
+        self.finished_at = {}
+
+    def apply(self, entry):
+        kind, username = entry[0], entry[1]
+        if kind == "claimed":
+            self.claimed.setdefault(username, {})[entry[2]] = entry[3] if len(entry) > 3 else time.time()
+        elif kind in ("completed", "released"):
+            claimed = self.claimed.get(username)
+            if claimed is not None:
+                claimed.pop(entry[2], None)
+                if not claimed:
+                    del self.claimed[username]
+        elif kind == "finished":
+            self.finished_at[username] = (entry[2], entry[3])
+
+    def evict(self):
+        cutoff = time.time() - self.ttl
+        self.finished_at = {
+            username: entry for username, entry in self.finished_at.items() if entry[0] > cutoff
+        }
+        for username in list(self.claimed):
+            claimed = {task_id: stamp for task_id, stamp in self.claimed[username].items() if stamp > cutoff}
+            if claimed:
+                self.claimed[username] = claimed
+            else:
+                del self.claimed[username]
+
+    def live_entries(self):
+        return len(self.finished_at) + sum(len(claimed) for claimed in self.claimed.values())
+
+    def snapshot(self):
+        for username, claimed in self.claimed.items():
+            for task_id, stamp in claimed.items():
+                yield ["claimed", username, task_id, stamp]
+        for username, (stamp, ok) in self.finished_at.items():
+            yield ["finished", username, stamp, ok]
+
+    def is_claimed(self, username, task_id):
+        return str(task_id) in self.claimed.get(username, ())
+
+    def mark_claimed(self, username, task_id):
+        self.append("claimed", username, str(task_id), time.time())
+
+    def mark_completed(self, username, task_id):
+        if self.is_claimed(username, task_id):
+            self.append("completed", username, str(task_id))
+
+    def mark_released(self, username, task_id):
+        """
+        Drops a remembered claim the server no longer knows about
+        """
+        if self.is_claimed(username, task_id):
+            self.append("released", username, str(task_id))
+
+    def mark_finished(self, username, ok):
+        self.append("finished", username, time.time(), bool(ok))
+
+    def end_cycle(self):
+        """
+        Forgets finished accounts once a whole cycle completed, so the next
+        run starts a fresh one
+        """
+        self.finished_at = {}
+        self.compact_next = True
+        self.mark_dirty()
+
+    def due_at(self, username, interval, retry_interval):
+        """
+        When an account that already finished in this cycle is due again,
+        or None if it has not finished
+        """
+        entry = self.finished_at.get(username)
+        if entry is None:
+            return None
+        stamp, ok = entry
+        return stamp + (interval if ok else retry_interval)
+
+class ReplayResponse:
+    """
+    Stand-in for an aiohttp response served from a Cassette
+    """
+    def __init__(self, method, url, status, body, headers):
+        self.method = method
+        self.url = url
+        self.status = status
+        self.body = body
+        self.headers = headers
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise ClientResponseError(
+                RequestInfo(URL(self.url), self.method, {}), (),
+                status=self.status, message="Replayed error", headers=self.headers
+            )
+
+    async def read(self):
+        return self.body.encode()
+
+    async def json(self, loads=json.loads):
+        return loads(self.body)
+
+class ReplayRequest:
+    """
+    Async context manager that yields a replayed response, used in place
+    of ClientSession.request
+    """
+    def __init__(self, cassette, method, url, account=None):
+        self.cassette = cassette
+        self.method = method
+        self.url = url
+        self.account = account
+
+    async def __aenter__(self):
+        return await self.cassette.replay(self.method, self.url, self.account)
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class Cassette:
+    """
+    Records API request/response pairs and replays them without a network
+
+    Entries are keyed by account, method and URL path and kept as
+    gzip-compressed JSON lines. Tokens are never stored: a `token` in a
+    response body is dropped and only its remaining lifetime is kept, and
+    replay hands out an unsigned token with that lifetime instead. On replay each key
+    serves its responses in recorded order and starts over once they run
+    out; accounts that were not recorded get responses of recorded
+    accounts for the same path. Recorded latencies are slept through
+    divided by `speed`; a speed of 0 replays instantly.
+    """
+    def __init__(self, path, mode="replay", speed=1.0):
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.entries = []
+        self.by_key = {}
+        self.by_path = {}
+        self.positions = {}
+        self.responses = {}
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def load(self):
+        with gzip.open(self.path, 'rt', encoding="utf-8") as file:
+            self.entries = [json.loads(line) for line in file if line.strip()]
+        self.by_key = {}
+        self.by_path = {}
+        for entry in self.entries:
+            self.by_key.setdefault((entry["a"], entry["m"], entry["p"]), []).append(entry)
+            self.by_path.setdefault((entry["m"], entry["p"]), []).append(entry)
+        self.positions = {}
+        return self
+
+    def accounts(self):
+        """
+        Account names that appear in the cassette, in first-seen order
+        """
+        return list(dict.fromkeys(entry["a"] for entry in self.entries if entry["a"]))
+
+    @staticmethod
+    def token_lifetime(token):
+        try:
+            payload = json_loads(base64.urlsafe_b64decode(token.split(".")[1] + "=="))
+            return max(0, int(float(payload["exp"]) - time.time()))
+        except Exception:
+            return 3600
+
+    @staticmethod
+    def synthetic_token(account, lifetime):
+        """
+        Unsigned JWT-shaped token for `account` that expires in `lifetime`
+        seconds, standing in for a token redacted at record time
+        """
+        def encode(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+        payload = {"user_name": account, "exp": int(time.time() + lifetime)}
+        return f'{encode({"alg": "none", "typ": "JWT"})}.{encode(payload)}.replay'
+
+    async def capture(self, method, url, account, response, started):
+        body = (await response.read()).decode("utf-8", "replace")
+        entry = {
+            "a": account, "m": method, "p": urlsplit(url).path, "s": response.status,
+            "t": round(time.monotonic() - started, 4)
+        }
+        if '"token"' in body:
+            try:
+                data = json_loads(body)
+            except ValueError:
+                data = None
+            if isinstance(data, dict) and isinstance(data.get("token"), str):
+                entry["x"] = self.token_lifetime(data.pop("token"))
+                body = json.dumps(data)
+        entry["b"] = body
+        if response.headers.get("Retry-After"):
+            entry["h"] = {"Retry-After": response.headers["Retry-After"]}
+        self.entries.append(entry)
+
+    def next_entry(self, key, entries):
+        position = self.positions.get(key, 0)
+        self.positions[key] = position + 1
+        return entries[position % len(entries)]
+
+    async def replay(self, method, url, account):
+        path = urlsplit(url).path
+        key = (account, method, path)
+        if key in self.by_key:
+            entry = self.next_entry(key, self.by_key[key])
+        elif (method, path) in self.by_path:
+            entry = self.next_entry((None, method, path), self.by_path[(method, path)])
+        else:
+            self.responses[404] = self.responses.get(404, 0) + 1
+            return ReplayResponse(method, url, 404, '{"success": false, "message": "Not in cassette"}', {})
+        if self.speed > 0:
+            await asyncio.sleep(entry["t"] / self.speed)
+        self.responses[entry["s"]] = self.responses.get(entry["s"], 0) + 1
+        body = entry["b"]
+        if "x" in entry:
+            body = json.dumps({**json_loads(body), "token": self.synthetic_token(account, entry["x"])})
+        return ReplayResponse(method, url, entry["s"], body, entry.get("h", {}))
+
+    def save(self):
+        if self.mode != "record" or not self.entries:
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(self.path)}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            with gzip.open(tmp_path, 'wt', encoding="utf-8") as file:
+                file.writelines(json.dumps(entry, separators=(",", ":")) + "\n" for entry in self.entries)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        logger.info(f"Recorded {len(self.entries)} responses to {self.path}")
+
+class ProxyRecord:
+    """
+    One parsed proxy plus its health statistics, stored in __slots__ so
+    pools of 50k+ entries stay small
+    """
+    __slots__ = ("scheme", "host", "port", "auth", "latency", "successes", "failures", "streak", "healthy")
+    SCHEMES = ("http", "https", "socks4", "socks5")
+
+    def __init__(self, scheme, host, port, auth=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.auth = auth
+        self.latency = None
+        self.successes = 0
+        self.failures = 0
+        self.streak = 0
+        self.healthy = False
+
+    @classmethod
+    def parse(cls, line: str):
+        """
+        Parses 'scheme://[user:pass@]host:port' (scheme defaults to http),
+        returning None for anything malformed
+        """
+        line = line.strip()
+        if not line or line.startswith("#"):
+            return None
+        scheme, separator, rest = line.partition("://")
+        if not separator:
+            scheme, rest = "http", line
+        scheme = scheme.lower()
+        if scheme not in cls.SCHEMES:
+            return None
+        auth, _, address = rest.rpartition("@")
+        host, _, port = address.rstrip("/").rpartition(":")
+        if not host or not port.isdigit() or not 0 < int(port) < 65536:
+            return None
+        return cls(scheme, host, int(port), auth or None)
+
+    @property
+    def key(self):
+        return (self.scheme, self.host, self.port, self.auth)
+
+    @property
+    def url(self):
+        auth = f"{self.auth}@" if self.auth else ""
+        return f"{self.scheme}://{auth}{self.host}:{self.port}"
+
+class ProxyPool:
+    """
+    Deduplicated list of parsed proxies with per-scheme counts kept as
+    entries are added
+    """
+    def __init__(self):
+        self.records = []
+        self.seen = set()
+        self.counts = {"http": 0, "socks4": 0, "socks5": 0}
+        self.invalid = 0
+        self.duplicates = 0
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def add_line(self, line: str):
+        record = ProxyRecord.parse(line)
+        if record is None:
+            if line.strip():
+                self.invalid += 1
+            return None
+        key = record.key
+        if key in self.seen:
+            self.duplicates += 1
+            return None
+        self.seen.add(key)
+        self.records.append(record)
+        self.counts["http" if record.scheme in ("http", "https") else record.scheme] += 1
+        return record
+
+class ProxyHealthChecker:
+    """
+    Probes proxies concurrently and ranks the healthy ones by latency
+
+    Proxies that never answer a probe are dropped. Healthy proxies keep a
+    moving average of their latency and a success/failure count, fed both
+    by probes and by real requests, and are demoted after
+    `failure_threshold` consecutive failures. Probes go to a neutral
+    `probe_url`, never to the Quest API.
+    """
+    def __init__(self, probe_url='https://www.gstatic.com/generate_204', concurrency=100, timeout=8,
+                 failure_threshold=3, recheck_interval=600):
+        self.probe_url = probe_url
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.recheck_interval = recheck_interval
+        self.stats = {}
+        self.candidates = []
+        self.ranking = None
+
+    def record_success(self, proxy, latency):
+        record = self.stats.get(proxy)
+        if record is None:
+            record = ProxyRecord.parse(proxy)
+            if record is None:
+                return
+            self.stats[proxy] = record
+        record.successes += 1
+        record.streak = 0
+        record.latency = latency if record.latency is None else 0.7 * record.latency + 0.3 * latency
+        record.healthy = True
+        self.ranking = None
+
+    def record_failure(self, proxy):
+        record = self.stats.get(proxy)
+        if record is None:
+            # An unchecked proxy from the fallback list; track it so it can
+            # be skipped once it keeps failing
+            record = ProxyRecord.parse(proxy)
+            if record is None:
+                return
+            self.stats[proxy] = record
+        record.failures += 1
+        record.streak += 1
+        if record.healthy and record.streak >= self.failure_threshold:
+            record.healthy = False
+            self.ranking = None
+            logger.debug(f"Proxy demoted after {record.streak} failures: {proxy}")
+
+    def ranked(self):
+        """
+        URLs of healthy proxies, fastest first
+        """
+        if self.ranking is None:
+            healthy = sorted(
+                (record for record in self.stats.values() if record.healthy),
+                key=lambda record: record.latency
+            )
+            self.ranking = [record.url for record in healthy]
+        return self.ranking
+
+    def is_healthy(self, proxy):
+        record = self.stats.get(proxy)
+        return record is not None and record.healthy
+
+    def is_failing(self, proxy):
+        """
+        True once `proxy` failed `failure_threshold` times in a row
+        """
+        record = self.stats.get(proxy)
+        return record is not None and record.streak >= self.failure_threshold
+
+    async def probe(self, record):
+        proxy = record.url
+        start = time.monotonic()
+        try:
+            async with ClientSession(
+                connector=load_socks().ProxyConnector.from_url(proxy),
+                timeout=ClientTimeout(total=self.timeout)
+            ) as session:
+                async with session.get(self.probe_url) as response:
+                    await response.read()
+        except Exception:
+            self.stats.setdefault(proxy, record)
+            self.record_failure(proxy)
+            if not record.successes or record.streak >= self.failure_threshold * 3:
+                del self.stats[proxy]
+            return False
+        self.stats.setdefault(proxy, record)
+        self.record_success(proxy, time.monotonic() - start)
+        return True
+
+    async def check(self, records, wanted=None, budget=None):
+        """
+        Probes proxy records with a bounded pool of workers
+
+        Stops once `wanted` healthy proxies are known or, with `budget`, once
+        that many seconds passed (probes in flight still finish), and returns
+        the records that were not probed yet, to be kept as candidates for
+        later top-ups.
+        """
+        iterator = iter(records)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget if budget else None
+
+        async def worker():
+            for record in iterator:
+                await self.probe(record)
+                if wanted and len(self.ranked()) >= wanted:
+                    return
+                if deadline is not None and loop.time() >= deadline:
+                    return
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return list(iterator)
+
+    async def top_up(self, wanted):
+        if wanted and len(self.ranked()) < wanted and self.candidates:
+            self.candidates = await self.check(self.candidates, wanted)
+
+    async def monitor(self, wanted=None):
+        """
+        Tops the healthy proxies up to `wanted` from the unprobed candidates
+        right away, then periodically re-probes known proxies, promoting
+        recovered ones and dropping dead ones, and tops up again
+        """
+        await self.top_up(wanted)
+        logger.info(f"Proxy top-up: {len(self.ranked())} healthy proxies")
+        while True:
+            await asyncio.sleep(self.recheck_interval)
+            await self.check(list(self.stats.values()))
+            await self.top_up(wanted)
+            logger.info(f"Proxy re-check: {len(self.ranked())} healthy proxies")
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram in the Prometheus style
+    """
+    BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(buckets or self.BUCKETS)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        """
+        Upper bucket bound containing the q-th quantile (an estimate),
+        capped at the largest observed value so it is always finite
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag: how much later than scheduled a timer that
+    should fire every `interval` seconds actually runs
+
+    With `stall_threshold` set, every lag at or above it is counted and
+    logged as a stall.
+    """
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+    def __init__(self, interval=0.05, metrics=None, stall_threshold=None):
+        self.interval = interval
+        self.metrics = metrics
+        self.stall_threshold = stall_threshold
+        self.histogram = Histogram(self.BUCKETS)
+        self.max = 0.0
+        self.stalls = 0
+
+    def reset(self):
+        self.histogram = Histogram(self.BUCKETS)
+        self.max = 0.0
+        self.stalls = 0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.histogram.observe(lag)
+            self.max = max(self.max, lag)
+            if self.metrics is not None:
+                self.metrics.observe("event_loop_lag_seconds", lag, buckets=self.BUCKETS)
+            if self.stall_threshold is not None and lag >= self.stall_threshold:
+                self.stalls += 1
+                logger.warning(f"Event loop stalled for {lag * 1000:.0f} ms")
+
+    def stats(self):
+        count = self.histogram.count
+        return {
+            "samples": count,
+            "mean_ms": round(self.histogram.sum / count * 1000, 2) if count else 0.0,
+            "p99_ms": round(min(self.histogram.quantile(0.99), self.max) * 1000, 2) if count else 0.0,
+            "max_ms": round(self.max * 1000, 2),
+            "stalls": self.stalls
+        }
+
+class Profiler:
+    """
+    Opt-in per-cycle profile of where account runs spend their time
+
+    Request time is timed per phase (auth, revalidate, info, list, claim,
+    complete), together with the rate limiter and retry backoff waits
+    (pacing), JSON decoding (decode) and progress rendering (progress).
+    Phases overlap across concurrent accounts, and pacing and decode are
+    also part of the request phase they happen in, so the totals are wall
+    time spent in each phase rather than a breakdown of the cycle.
+
+    A cycle ends once every account finished a run; one JSON line with the
+    phase timings and the event loop lag of that cycle is then appended to
+    `path`. With `cprofile_path` the first cycle also runs under cProfile,
+    its stats are dumped there and the slowest functions are added to the
+    report.
+    """
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    PHASES = {
+        "user/auth": "auth",
+        "ecom-gateway/revalidate": "revalidate",
+        "user/info": "info",
+        "task/list": "list",
+        "partners": "list",
+        "task/claim": "claim",
+        "partners/claim": "claim",
+        "task/complete": "complete"
+    }
+
+    def __init__(self, path, loop_lag, cprofile_path=None, top=20):
+        self.path = path
+        self.loop_lag = loop_lag
+        self.cprofile_path = cprofile_path
+        self.top = top
+        self.total = 0
+        self.cycle = 0
+        self.done = 0
+        self.succeeded = 0
+        self.phases = {}
+        self.started = None
+        self.profile = None
+
+    @classmethod
+    def phase_of(cls, endpoint):
+        return cls.PHASES.get(endpoint, endpoint)
+
+    def start(self, total):
+        """
+        Begins a cycle over `total` accounts
+        """
+        self.total = total
+        self.done = self.succeeded = 0
+        self.phases = {}
+        self.loop_lag.reset()
+        self.started = time.monotonic()
+        if self.cprofile_path and self.cycle == 0:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(name, time.monotonic() - started)
+
+    def record(self, name, duration):
+        entry = self.phases.get(name)
+        if entry is None:
+            entry = self.phases[name] = [Histogram(self.BUCKETS), 0.0]
+        entry[0].observe(duration)
+        entry[1] = max(entry[1], duration)
+
+    def account_finished(self, username, result):
+        self.done += 1
+        self.succeeded += bool(result)
+        if self.done >= self.total:
+            self.end_cycle()
+
+    def phase_stats(self):
+        stats = {}
+        for name, (histogram, longest) in sorted(self.phases.items()):
+            stats[name] = {
+                "count": histogram.count,
+                "total_s": round(histogram.sum, 3),
+                "mean_ms": round(histogram.sum / histogram.count * 1000, 2),
+                "p50_ms": round(min(histogram.quantile(0.5), longest) * 1000, 2),
+                "p99_ms": round(min(histogram.quantile(0.99), longest) * 1000, 2),
+                "max_ms": round(longest * 1000, 2)
+            }
+        return stats
+
+    def stop_cprofile(self):
+        """
+        Dumps the cProfile stats and returns the `top` functions by own time
+        """
+        import pstats
+        self.profile.disable()
+        self.profile.dump_stats(self.cprofile_path)
+        stats = pstats.Stats(self.profile).stats
+        self.profile = None
+        slowest = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:self.top]
+        return [
+            {
+                "function": f"{os.path.basename(filename)}:{line}({name})",
+                "calls": calls,
+                "own_s": round(own, 4),
+                "cumulative_s": round(cumulative, 4)
+            }
+            for (filename, line, name), (_, calls, own, cumulative, _) in slowest
+        ]
+
+    def end_cycle(self, complete=True):
+        """
+        Appends the report of the current cycle to `path` and starts the next
+        """
+        if self.started is None:
+            return None
+        self.cycle += 1
+        report = {
+            "cycle": self.cycle,
+            "timestamp": time.time(),
+            "complete": complete,
+            "elapsed_s": round(time.monotonic() - self.started, 3),
+            "accounts": self.done,
+            "succeeded": self.succeeded,
+            "phases": self.phase_stats(),
+            "loop_lag": self.loop_lag.stats()
+        }
+        if self.profile is not None:
+            report["cprofile"] = self.stop_cprofile()
+        if self.path:
+            with open(self.path, 'a') as file:
+                file.write(json.dumps(report, separators=(",", ":")) + "\n")
+        logger.info(
+            f"Profile of cycle {self.cycle} written to {self.path}: "
+            + ", ".join(f"{name} {stats['total_s']}s" for name, stats in report["phases"].items())
+        )
+        self.start(self.total)
+        return report
+
+    def close(self):
+        """
+        Reports a cycle cut short by shutdown
+        """
+        if self.phases or self.profile is not None:
+            self.end_cycle(complete=False)
+        self.started = None
+
+class Metrics:
+    """
+    In-process counters and histograms for the request path and account runs
+
+    Exposed as Prometheus text through an optional local HTTP endpoint and
+    as periodic JSON snapshots.
+    """
+    PREFIX = "redacted"
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.account_durations = {}
+
+    @staticmethod
+    def labels_key(labels):
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def proxy_label(proxy):
+        """
+        Proxy URL without credentials, or 'direct'
+        """
+        if not proxy:
+            return "direct"
+        parts = urlsplit(proxy)
+        return f"{parts.scheme}://{parts.hostname}:{parts.port}"
+
+    @staticmethod
+    def status_of(error):
+        if isinstance(error, ClientResponseError):
+            return str(error.status)
+        return type(error).__name__
+
+    def inc(self, name, value=1, **labels):
+        key = (name, self.labels_key(labels))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=None, **labels):
+        key = (name, self.labels_key(labels))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    def observe_request(self, endpoint, proxy, status, duration, failed=False):
+        proxy = self.proxy_label(proxy)
+        self.inc("requests_total", endpoint=endpoint, status=status)
+        self.observe("request_duration_seconds", duration, endpoint=endpoint)
+        self.inc("proxy_requests_total", proxy=proxy, outcome="failure" if failed else "success")
+        self.observe("proxy_request_duration_seconds", duration, proxy=proxy)
+        if failed:
+            self.inc("request_failures_total", endpoint=endpoint, status=status)
+
+    def observe_account(self, username, duration, ok):
+        self.account_durations[username] = round(duration, 3)
+        self.observe("account_cycle_seconds", duration)
+        self.inc("accounts_processed_total", result="success" if ok else "failure")
+
+    @staticmethod
+    def format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (
+            f'{key}="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+            for key, value in pairs
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def render_prometheus(self):
+        lines = []
+        typed = set()
+        for (name, labels), value in sorted(self.counters.items()):
+            metric = f"{self.PREFIX}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{self.format_labels(labels)} {value}")
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            metric = f"{self.PREFIX}_{name}"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for bound, total in histogram.cumulative():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{metric}_bucket{self.format_labels(labels, [('le', le)])} {total}")
+            lines.append(f"{metric}_sum{self.format_labels(labels)} {histogram.sum}")
+            lines.append(f"{metric}_count{self.format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        return {
+            "timestamp": time.time(),
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self.counters.items()
+            ],
+            "histograms": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99)
+                }
+                for (name, labels), histogram in self.histograms.items()
+            ],
+            "accounts": self.account_durations
+        }
+
+    async def serve(self, host="127.0.0.1", port=9108):
+        """
+        Starts a /metrics endpoint in Prometheus text format
+        """
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.render_prometheus(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Metrics available at http://{host}:{port}/metrics")
+        return runner
+
+    async def write_snapshots(self, path, interval=60):
+        """
+        Writes a JSON snapshot to `path` every `interval` seconds
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            content = json.dumps(self.snapshot(), separators=(",", ":"))
+            await loop.run_in_executor(None, write_atomic, path, content)
+
+class FleetProgress:
+    """
+    One aggregated progress view for all accounts in a run
+
+    Interactive runs render a single Rich progress bar; headless runs log a
+    progress line at most every `log_interval` seconds instead. Every
+    `total` finished account runs count as one round, after which a summary
+    is logged and the counters start over.
+    """
+    def __init__(self, total, interactive=True, log_interval=30):
+        self.total = total
+        self.interactive = interactive
+        self.log_interval = log_interval
+        self.done = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.points = 0
+        self.progress = None
+        self.task = None
+        self.last_log = 0.0
+
+    def __enter__(self):
+        if self.interactive:
+            from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn, TimeElapsedColumn
+            self.progress = Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                TaskProgressColumn(),
+                TimeElapsedColumn(),
+                console=get_console()
+            )
+            self.progress.start()
+            self.task = self.progress.add_task(self.description(), total=self.total)
+        self.last_log = time.monotonic()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.progress is not None:
+            self.progress.stop()
+        return False
+
+    def description(self):
+        return (
+            f"[cyan]Accounts {self.done}/{self.total}[/cyan] | "
+            f"[green]ok {self.succeeded}[/green] | [red]failed {self.failed}[/red] | +{self.points} points"
+        )
+
+    def advance(self, username, result):
+        self.done += 1
+        if result:
+            self.succeeded += 1
+            if isinstance(result, dict):
+                self.points += result.get("points", 0)
+        else:
+            self.failed += 1
+
+        if self.done >= self.total:
+            logger.info(
+                f"Round finished: {self.succeeded}/{self.total} accounts ok, "
+                f"{self.failed} failed, +{self.points} points"
+            )
+            self.done = self.succeeded = self.failed = self.points = 0
+            if self.progress is not None:
+                self.progress.reset(self.task, total=self.total, description=self.description())
+            return
+
+        if self.progress is not None:
+            self.progress.update(self.task, completed=self.done, description=self.description())
+            return
+        now = time.monotonic()
+        if now - self.last_log >= self.log_interval:
+            self.last_log = now
+            logger.info(
+                f"Fleet progress: {self.done}/{self.total} accounts, "
+                f"{self.succeeded} ok, {self.failed} failed, +{self.points} points"
+            )
+
+class AccountScheduler:
+    """
+    Runs account jobs from a work queue with a bounded number of workers
+
+    The queue is fed lazily from the given iterable, so at most
+    `concurrency` accounts are in flight at any time. Results are collected
+    per account as soon as each job finishes, unless `collect` is False.
+    """
+    def __init__(self, job, concurrency=10, metrics=None, on_result=None, collect=True):
+        self.job = job
+        self.concurrency = max(1, concurrency)
+        self.metrics = metrics
+        self.on_result = on_result
+        self.collect = collect
+        self.results = {}
+
+    async def feed(self, queue, accounts):
+        for account in accounts:
+            await queue.put(account)
+        for _ in range(self.concurrency):
+            await queue.put(None)
+
+    async def work(self, queue):
+        while True:
+            account = await queue.get()
+            try:
+                if account is None:
+                    return
+                token, username = account
+                started = time.monotonic()
+                try:
+                    result = await self.job(token, username)
+                except CircuitOpenError as e:
+                    self.blocked(token, username, e)
+                    continue
+                except Exception as e:
+                    logger.error(f"Account {username} failed: {e}")
+                    result = None
+                if self.metrics is not None:
+                    self.metrics.observe_account(username, time.monotonic() - started, bool(result))
+                self.finished(token, username, result)
+            finally:
+                queue.task_done()
+
+    def blocked(self, token, username, error):
+        """
+        Called instead of finished() when an open circuit breaker stopped
+        the job
+        """
+        logger.debug(f"Account {username} skipped: {error}")
+        self.finished(token, username, None)
+
+    def finished(self, token, username, result):
+        if self.collect:
+            self.results[username] = result
+        if self.on_result is not None:
+            self.on_result(username, result)
+
+    async def run(self, accounts):
+        """
+        Processes every (token, username) pair and returns results by username
+        """
+        self.results = {}
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self.work(queue)) for _ in range(self.concurrency)]
+        try:
+            await self.feed(queue, accounts)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+        return self.results
+
+class RollingScheduler(AccountScheduler):
+    """
+    Runs every account on its own schedule from a priority queue
+
+    Each account is due again `interval` seconds after its own run
+    finished (`retry_interval` after a failed run), so a slow or stuck
+    account never holds back the rest of the fleet. With `once=True` every
+    account runs a single time and run() returns.
+
+    With a CheckpointJournal, finished runs are recorded in it and accounts
+    that already finished before a restart keep their due time instead of
+    running again immediately.
+
+    Accounts that are due go straight into the bounded work queue as the
+    account source is read; only future runs are kept in the heap, as
+    usernames without their tokens. When the earliest run is due, every
+    run due within `dispatch_window` seconds is taken at once and their
+    current tokens are looked up in `tokens` (a TokenStore) in one pass
+    over the file; accounts no longer in it are dropped. Accounts stopped
+    by an open circuit breaker are requeued for when the breaker lets a
+    probe through, without counting as a run.
+    """
+    def __init__(self, job, concurrency=10, metrics=None, on_result=None,
+                 interval=12 * 60 * 60, retry_interval=15 * 60, once=False, journal=None, tokens=None):
+        super().__init__(job, concurrency, metrics, on_result, collect=False)
+        self.interval = interval
+        self.retry_interval = retry_interval
+        self.once = once
+        self.journal = journal
+        self.tokens = tokens
+        self.dispatch_window = min(60.0, interval / 100)
+        self.in_flight = 0
+        self.heap = []
+        self.sequence = itertools.count()
+        self.wakeup = None
+
+    def due_within(self, seconds):
+        """
+        Usernames of the scheduled accounts due in the next `seconds`
+        """
+        horizon = time.time() + seconds
+        return [username for at, _, username in self.heap if at <= horizon]
+
+    def schedule(self, username, at):
+        heapq.heappush(self.heap, (at, next(self.sequence), username))
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def blocked(self, token, username, error):
+        self.in_flight -= 1
+        logger.debug(f"Requeueing {username}: {error}")
+        self.schedule(username, time.time() + error.retry_in * random.uniform(1.0, 1.2))
+
+    def finished(self, token, username, result):
+        super().finished(token, username, result)
+        self.in_flight -= 1
+        if self.wakeup is not None:
+            self.wakeup.set()
+        if self.journal is not None:
+            self.journal.mark_finished(username, result)
+        if not self.once:
+            delay = self.interval if result else self.retry_interval
+            self.schedule(username, time.time() + delay)
+
+    async def feed(self, queue, accounts):
+        self.wakeup = asyncio.Event()
+        resumed = 0
+        for token, username in accounts:
+            due_at = None
+            if self.journal is not None:
+                due_at = self.journal.due_at(username, self.interval, self.retry_interval)
+            if due_at is None or due_at <= time.time():
+                self.in_flight += 1
+                await queue.put((token, username))
+                continue
+            resumed += 1
+            if self.once:
+                AccountScheduler.finished(self, token, username, True)
+            else:
+                self.schedule(username, due_at)
+        if resumed:
+            logger.info(f"Resuming cycle: {resumed} accounts already finished before the restart")
+
+        announced = None
+        while self.heap or self.in_flight or not self.once:
+            if not self.heap:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+            due_at = self.heap[0][0]
+            delay = due_at - time.time()
+            if delay > 0:
+                if delay > 60 and announced != due_at:
+                    announced = due_at
+                    logger.info(f"Next account due in {format_seconds(delay)}")
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            horizon = time.time() + self.dispatch_window
+            due = []
+            while self.heap and self.heap[0][0] <= horizon:
+                due.append(heapq.heappop(self.heap)[2])
+            tokens = await self.tokens.resolve(due)
+            for username in due:
+                token = tokens.get(username)
+                if token is None:
+                    logger.warning(f"{username}: no longer in the token file, dropped from the schedule")
+                    continue
+                self.in_flight += 1
+                await queue.put((token, username))
+
+        for _ in range(self.concurrency):
+            await queue.put(None)
 
 class RedactedAirways:
-    def __init__(self) -> None:
-        self.headers = {
-            'Accept': '*/*',
-            'Accept-Language': 'id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7',
-            'Referer': 'https://quest.redactedairways.com/home',
-            'Sec-Fetch-Dest': 'empty',
-            'Sec-Fetch-Mode': 'cors',
-            'Sec-Fetch-Site': 'same-origin',
-            'User-Agent': FakeUserAgent().random
-        }
-        self.proxies = []
+    PROXY_MODES = {"monosans": 1, "private": 2, "none": 3}
+
+    def __init__(self, concurrency=10, account_concurrency=4, rate_limit=10.0, burst=20,
+                 endpoint_limits=None, base_url='https://quest.redactedairways.com',
+                 metrics_port=None, metrics_path=None, metrics_interval=60,
+                 interactive=True, proxy_mode=None, run_interval=12 * 60 * 60, retry_interval=15 * 60,
+                 once=False, workers=1, log_format="rich", log_file=None, runtime="fast",
+                 record=None, replay=None, replay_speed=1.0, profile=None, cprofile=None) -> None:
+        self.headers = dict(get_base_headers())
+        self.base_url = base_url.rstrip('/')
+        self.proxies = ProxyPool()
         self.proxy_index = 0
         self.account_proxies = {}
-        self.console = console
+        self.proxy_checker = ProxyHealthChecker()
+        self.wanted_proxies = 200
+        self.min_proxies = 20
+        self.proxy_check_budget = 30
+        self.sessions = SessionManager()
+        self.retry_policy = RetryPolicy()
+        self.breakers = CircuitBreakers()
+        self.rate_limiter = RateLimiter(rate_limit, burst, endpoint_limits)
+        self.token_store = TokenStore(self.decode_token)
+        self.journal = CheckpointJournal(ttl=max(run_interval, retry_interval))
+        self.refreshing = {}
+        self.scheduler = None
+        self.active_accounts = set()
+        self.token_margin = 300
+        self.refresh_window = 900
+        self.concurrency = concurrency
+        self.account_concurrency = account_concurrency
+        self.metrics = Metrics()
+        self.breakers.metrics = self.metrics
+        self.loop_lag = LoopLagMonitor(metrics=self.metrics)
+        self.loop_lag_task = None
+        self.metrics_port = metrics_port
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.interactive = interactive
+        self.proxy_mode = proxy_mode
+        self.run_interval = run_interval
+        self.retry_interval = retry_interval
+        self.once = once
+        self.workers = workers
+        self.log_format = log_format
+        self.log_file = log_file
+        self.cassette = None
+        if record:
+            self.cassette = Cassette(record, "record")
+        elif replay:
+            self.cassette = Cassette(replay, "replay", replay_speed)
+        self.profiler = None
+        if profile or cprofile:
+            self.loop_lag.stall_threshold = 0.1
+            self.profiler = Profiler(profile or "profile.jsonl", self.loop_lag, cprofile)
+        self.runtime = runtime
+        self.on_token_refresh = None
+
+    @property
+    def console(self):
+        return get_console()
 
     def clear_terminal(self):
         os.system('cls' if os.name == 'nt' else 'clear')
@@ -61,89 +2129,148 @@ class RedactedAirways:
         """)
 
     def format_seconds(self, seconds):
-        hours, remainder = divmod(seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        return f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}"
+        return format_seconds(seconds)
+
+    def phase(self, name):
+        """
+        Times `name` in the cycle profile, a no-op unless profiling
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.phase(name)
+
+    def spinner(self):
+        """
+        Rich progress context in interactive mode, a no-op (None) otherwise
+        """
+        if not self.interactive:
+            return nullcontext()
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+        return Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(),
+            console=self.console
+        )
 
     async def load_proxies(self, use_proxy_choice: int):
         filename = "proxy.txt"
         try:
-            with Progress(
-                SpinnerColumn(),
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TaskProgressColumn()
-            ) as progress:
-                task = progress.add_task("[cyan]Loading proxies...", total=None)
+            with self.spinner() as progress:
+                task = progress.add_task("[cyan]Loading proxies...", total=None) if progress else None
                 
+                self.proxies = ProxyPool()
                 if use_proxy_choice == 1:
                     async with ClientSession(timeout=ClientTimeout(total=30)) as session:
                         async with session.get("https://raw.githubusercontent.com/monosans/proxy-list/main/proxies/all.txt") as response:
                             response.raise_for_status()
-                            content = await response.text()
                             with open(filename, 'w') as f:
-                                f.write(content)
-                            self.proxies = content.splitlines()
+                                async for raw_line in response.content:
+                                    line = raw_line.decode("utf-8", "ignore")
+                                    f.write(line)
+                                    self.proxies.add_line(line)
                 else:
                     if not os.path.exists(filename):
                         logger.error("File proxy.txt Not Found.")
                         return
                     with open(filename, 'r') as f:
-                        self.proxies = f.read().splitlines()
+                        for line in f:
+                            self.proxies.add_line(line)
 
                 if not self.proxies:
                     logger.error("No Proxies Found.")
                     return
 
-                progress.update(task, completed=100)
-                logger.info(f"Loaded {len(self.proxies)} proxies successfully")
+                if progress:
+                    progress.update(task, completed=100)
+                logger.info(
+                    f"Loaded {len(self.proxies)} proxies successfully "
+                    f"({self.proxies.duplicates} duplicates, {self.proxies.invalid} invalid skipped)"
+                )
+
+                if progress:
+                    progress.update(task, description="[cyan]Checking proxies...")
+                # Accounts start once a few proxies are healthy; the monitor
+                # keeps topping up to `wanted_proxies` in the background
+                self.proxy_checker.candidates = await self.proxy_checker.check(
+                    self.proxies, wanted=self.min_proxies, budget=self.proxy_check_budget
+                )
+                healthy = self.proxy_checker.ranked()
+                if healthy:
+                    logger.info(f"{len(healthy)} healthy proxies, fastest {self.proxy_checker.stats[healthy[0]].latency:.2f}s")
+                else:
+                    logger.warning("No healthy proxies found, falling back to the unchecked list")
 
         except Exception as e:
             logger.error(f"Failed To Load Proxies: {e}")
-            self.proxies = []
+            self.proxies = ProxyPool()
 
     def create_proxy_table(self):
+        from rich.table import Table
         table = Table(title="Proxy Statistics")
         table.add_column("Type", style="cyan")
         table.add_column("Count", style="green")
         table.add_column("Status", style="yellow")
         
-        proxy_types = {
-            "http": len([p for p in self.proxies if p.startswith(("http://", "https://"))]),
-            "socks4": len([p for p in self.proxies if p.startswith("socks4://")]),
-            "socks5": len([p for p in self.proxies if p.startswith("socks5://")]),
-        }
-        
-        for proxy_type, count in proxy_types.items():
+        for proxy_type, count in self.proxies.counts.items():
             status = "✓ Active" if count > 0 else "✗ None"
             table.add_row(proxy_type.upper(), str(count), status)
             
         return table
 
-    def check_proxy_schemes(self, proxies):
-        schemes = ["http://", "https://", "socks4://", "socks5://"]
-        if any(proxies.startswith(scheme) for scheme in schemes):
-            return proxies
-        return f"http://{proxies}"
+    def next_proxy(self):
+        """
+        Hands out healthy proxies fastest first, or the raw list if none
+        have been checked healthy
+        """
+        ranked = self.proxy_checker.ranked()
+        if ranked:
+            proxy = ranked[self.proxy_index % len(ranked)]
+            self.proxy_index = (self.proxy_index + 1) % len(ranked)
+            return proxy
+        if not self.proxies:
+            return None
+        for _ in range(len(self.proxies)):
+            proxy = self.proxies[self.proxy_index % len(self.proxies)].url
+            self.proxy_index = (self.proxy_index + 1) % len(self.proxies)
+            if not self.proxy_checker.is_failing(proxy):
+                break
+        return proxy
 
     def get_next_proxy_for_account(self, address):
-        if address not in self.account_proxies:
-            if not self.proxies:
+        proxy = self.account_proxies.get(address)
+        if (proxy is None or self.proxy_checker.is_failing(proxy)
+                or (self.proxy_checker.ranked() and not self.proxy_checker.is_healthy(proxy))):
+            proxy = self.next_proxy()
+            if proxy is None:
                 return None
-            proxy = self.check_proxy_schemes(self.proxies[self.proxy_index])
             self.account_proxies[address] = proxy
-            self.proxy_index = (self.proxy_index + 1) % len(self.proxies)
-        return self.account_proxies[address]
+        return proxy
 
     def rotate_proxy_for_account(self, address):
-        if not self.proxies:
+        proxy = self.next_proxy()
+        if proxy is None:
             return None
-        proxy = self.check_proxy_schemes(self.proxies[self.proxy_index])
         self.account_proxies[address] = proxy
-        self.proxy_index = (self.proxy_index + 1) % len(self.proxies)
         return proxy
 
+    def proxy_choice(self):
+        """
+        Proxy option from the CLI/config, the interactive question, or no
+        proxy when running headless
+        """
+        if self.proxy_mode:
+            choice = self.PROXY_MODES[self.proxy_mode]
+            logger.info(f"Proxy mode: {self.proxy_mode}")
+            return choice
+        if not self.interactive:
+            logger.info("Proxy mode: none")
+            return 3
+        return self.print_question()
+
     def print_question(self):
+        from rich.table import Table
         table = Table(title="Proxy Configuration Options")
         table.add_column("Option", style="cyan")
         table.add_column("Description", style="green")
@@ -170,107 +2297,254 @@ class RedactedAirways:
             except ValueError:
                 logger.error("Invalid input. Enter a number (1, 2 or 3).")
 
-    def decode_token(self, token: str):
+    def decode_token_payload(self, token: str):
         try:
             header, payload, signature = token.split(".")
-            decoded_payload = base64.urlsafe_b64decode(payload + "==").decode("utf-8")
-            parsed_payload = json.loads(decoded_payload)
-            return parsed_payload.get("user_name", "Unknown")
+            return json_loads(base64.urlsafe_b64decode(payload + "=="))
         except Exception:
             return None
 
-    def save_new_token(self, old_token, new_token):
-        file_path = 'data.txt'
-        with open(file_path, 'r') as file:
-            tokens = [line.strip() for line in file if line.strip()]
-        
-        updated_tokens = [new_token if token == old_token else token for token in tokens]
-        
-        with open(file_path, 'w') as file:
-            file.write("\n".join(updated_tokens) + "\n")
+    def decode_token(self, token: str):
+        payload = self.decode_token_payload(token)
+        if payload is None:
+            return None
+        return payload.get("user_name", "Unknown")
+
+    def token_expiry(self, token: str):
+        """
+        Returns the JWT `exp` claim as a unix timestamp, or None if unknown
+        """
+        payload = self.decode_token_payload(token)
+        try:
+            return float(payload["exp"])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def token_is_fresh(self, token: str, margin=None):
+        """
+        True if the token's `exp` is known and more than `margin` seconds away
+        """
+        expiry = self.token_expiry(token)
+        if margin is None:
+            margin = self.token_margin
+        return expiry is not None and expiry - time.time() > margin
+
+    def current_token(self, username, token=None):
+        return self.token_store.get(username, token)
+
+    async def refresh_token(self, username, token, proxy=None):
+        """
+        Revalidates an account token, sharing one in-flight refresh between
+        every caller of the same account
+
+        Returns the new token or None if revalidation failed.
+        """
+        pending = self.refreshing.get(username)
+        if pending is None:
+            pending = asyncio.ensure_future(self._refresh_token(username, token, proxy))
+            self.refreshing[username] = pending
+            pending.add_done_callback(lambda _: self.refreshing.pop(username, None))
+        return await asyncio.shield(pending)
+
+    async def _refresh_token(self, username, token, proxy=None):
+        new_token = await self.revalidate_token(token, proxy, username)
+        if new_token:
+            self.token_store.update(username, new_token)
+            if self.on_token_refresh is not None:
+                self.on_token_refresh(username, new_token)
+            logger.info(f"Token refreshed for {username}")
+        return new_token
+
+    async def refresh_expiring_tokens(self, accounts, use_proxy, concurrency=3):
+        """
+        Background pass that refreshes tokens expiring within `refresh_window`
+        seconds so they are ready before the account's turn comes
+        """
+        refreshed = {"ok": 0, "total": 0}
+
+        def count(username, result):
+            refreshed["total"] += 1
+            refreshed["ok"] += bool(result)
+
+        async def refresh(token, username):
+            proxy = self.get_next_proxy_for_account(username) if use_proxy else None
+            try:
+                return await self.refresh_token(username, token, proxy)
+            finally:
+                if username not in self.active_accounts:
+                    await self.sessions.release(username)
+
+        def expiring():
+            for token, username in accounts:
+                token = self.current_token(username, token)
+                if self.token_expiry(token) is not None and not self.token_is_fresh(token, self.refresh_window):
+                    yield token, username
+
+        await AccountScheduler(refresh, concurrency, on_result=count, collect=False).run(expiring())
+        if refreshed["total"]:
+            logger.info(f"Refreshed {refreshed['ok']}/{refreshed['total']} expiring tokens in the background")
+
+    async def keep_tokens_fresh(self, use_proxy):
+        """
+        Re-runs the background refresh pass over the accounts due within
+        `refresh_window`, so tokens are renewed ahead of each account's next
+        turn; accounts due later are left alone. Accounts due right away
+        refresh inline in process_accounts.
+        """
+        while True:
+            if self.scheduler is not None:
+                due = await self.token_store.resolve(self.scheduler.due_within(self.refresh_window))
+                await self.refresh_expiring_tokens(
+                    [(token, username) for username, token in due.items()], use_proxy
+                )
+            await asyncio.sleep(self.refresh_window / 3)
+
+    async def request(self, method: str, url: str, token=None, proxy=None, account=None,
+                      retries=3, timeout=20, deadline=None, headers=None, replay_auth=True):
+        """
+        Sends a request through the shared retry engine and returns the JSON body
+
+        Parameters:
+        - method: HTTP method
+        - url: Full endpoint URL
+        - token: Optional bearer token
+        - proxy: Optional proxy to use for request
+        - account: Account key used to pick the pooled session
+        - retries: Maximum number of attempts
+        - timeout: Per-attempt timeout in seconds
+        - deadline: Optional total time budget in seconds across all attempts
+        - headers: Extra headers merged over the base headers
+        - replay_auth: Revalidate the account token and replay once on 401
+
+        Raises the last error once attempts are exhausted, the error is not
+        retryable or the deadline would be exceeded.
+        """
+        if token and account and replay_auth:
+            token = self.current_token(account, token)
+        request_headers = {**self.headers, **(headers or {})}
+        if token:
+            request_headers['Authorization'] = f'Bearer {token}'
 
-    async def revalidate_token(self, token: str, proxy=None, retries=5):
-        url = 'https://quest.redactedairways.com/ecom-gateway/revalidate'
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + deadline if deadline else None
+        endpoint = endpoint_for(url)
+        # Replays are paced only by the recorded latency and `replay_speed`
+        replaying = self.cassette is not None and self.cassette.replaying
+        replayed = False
+        attempt = 0
+
+        # Covers retries, backoff and a replayed 401, so the phase shows the
+        # full time this call held up its account
+        with self.phase(Profiler.phase_of(endpoint)):
+            while True:
+                budget = timeout
+                if expires_at is not None:
+                    budget = min(timeout, expires_at - loop.time())
+                    if budget <= 0:
+                        raise asyncio.TimeoutError(f"Deadline exceeded for {url}")
+
+                if not replaying:
+                    self.breakers.check(endpoint, proxy)
+                    with self.phase("pacing"):
+                        await self.rate_limiter.acquire(url)
+                started = time.monotonic()
+                try:
+                    if replaying:
+                        pending = ReplayRequest(self.cassette, method, url, account)
+                    else:
+                        pending = self.sessions.get(proxy, account).request(
+                            method, url, headers=request_headers, timeout=ClientTimeout(total=budget)
+                        )
+                    async with pending as response:
+                        if proxy:
+                            self.proxy_checker.record_success(proxy, time.monotonic() - started)
+                        if self.cassette is not None and not self.cassette.replaying:
+                            await self.cassette.capture(method, url, account, response, started)
+                        response.raise_for_status()
+                        with self.phase("decode"):
+                            result = await response.json(loads=json_loads)
+                    self.metrics.observe_request(endpoint, proxy, str(response.status), time.monotonic() - started)
+                    if not replaying:
+                        self.breakers.record(endpoint, proxy)
+                    return result
+                except Exception as e:
+                    self.metrics.observe_request(
+                        endpoint, proxy, self.metrics.status_of(e), time.monotonic() - started, failed=True
+                    )
+                    if not replaying:
+                        self.breakers.record(endpoint, proxy, e)
+                    if proxy and isinstance(e, RetryPolicy.RETRYABLE_ERRORS):
+                        self.proxy_checker.record_failure(proxy)
+                    if (replay_auth and not replayed and token and account
+                            and isinstance(e, ClientResponseError) and e.status == 401):
+                        replayed = True
+                        new_token = await self.refresh_token(account, token, proxy)
+                        if new_token:
+                            token = new_token
+                            request_headers['Authorization'] = f'Bearer {token}'
+                            continue
+                    if attempt >= retries - 1 or not self.retry_policy.is_retryable(e):
+                        raise
+                    delay = self.retry_policy.delay(attempt, e)
+                    if replaying:
+                        delay = delay / self.cassette.speed if self.cassette.speed > 0 else 0.0
+                    if expires_at is not None and loop.time() + delay >= expires_at:
+                        raise
+                    logger.debug(f"Attempt {attempt+1} for {url} failed ({e}). Retrying in {delay:.1f}s")
+                    self.metrics.inc("request_retries_total", endpoint=endpoint)
+                    with self.phase("pacing"):
+                        await asyncio.sleep(delay)
+                    attempt += 1
+
+    async def revalidate_token(self, token: str, proxy=None, account=None, retries=5):
+        url = f'{self.base_url}/ecom-gateway/revalidate'
         headers = {
-            **self.headers,
-            'Authorization': f'Bearer {token}',
             'Content-Length': '0',
-            'Origin': 'https://quest.redactedairways.com',
+            'Origin': self.base_url,
         }
         
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            transient=True
-        ) as progress:
-            task = progress.add_task("[cyan]Revalidating token...", total=retries)
-            
-            for attempt in range(retries):
-                progress.update(task, completed=attempt)
-                connector = ProxyConnector.from_url(proxy) if proxy else None
-                try:
-                    async with ClientSession(connector=connector, timeout=ClientTimeout(total=20)) as session:
-                        async with session.post(url=url, headers=headers) as response:
-                            response.raise_for_status()
-                            result = await response.json()
-                            return result["token"]
-                except (Exception, ClientResponseError) as e:
-                    if attempt < retries - 1:
-                        await asyncio.sleep(5)
-                        continue
-                    return None
+        try:
+            result = await self.request(
+                "POST", url, token, proxy, account, retries=retries, headers=headers, replay_auth=False
+            )
+            return result["token"]
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.debug(f"Token revalidation failed: {e}")
+            return None
 
-    async def user_auth(self, token: str, proxy=None, retries=3):
+    async def user_auth(self, token: str, proxy=None, account=None, retries=3):
         """
         Verifies if the provided token is valid
         """
-        url = 'https://quest.redactedairways.com/api/v1/user/auth'
-        headers = {
-            **self.headers,
-            'Authorization': f'Bearer {token}'
-        }
+        url = f'{self.base_url}/api/v1/user/auth'
         
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=20)) as session:
-                    async with session.get(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        return result.get("success", False)
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                logger.error(f"Auth verification failed: {e}")
-                return False
+        try:
+            result = await self.request("GET", url, token, proxy, account, retries=retries)
+            return result.get("success", False)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"{account}: auth verification failed: {e}")
+            return False
 
-    async def user_info(self, token: str, proxy=None, retries=3):
+    async def user_info(self, token: str, proxy=None, account=None, retries=3):
         """
         Gets user information including points balance
         """
-        url = 'https://quest.redactedairways.com/api/v1/user/info'
-        headers = {
-            **self.headers,
-            'Authorization': f'Bearer {token}'
-        }
+        url = f'{self.base_url}/api/v1/user/info'
         
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=20)) as session:
-                    async with session.get(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        return result.get("data", {})
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                logger.error(f"Failed to get user info: {e}")
-                return None
+        try:
+            result = await self.request("GET", url, token, proxy, account, retries=retries)
+            return result.get("data", {})
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"{account}: failed to get user info: {e}")
+            return None
 
-    async def task_lists(self, token: str, task_type: str, proxy=None, retries=3):
+    async def task_lists(self, token: str, task_type: str, proxy=None, account=None, retries=3):
         """
         Gets list of tasks based on the specified task type
         
@@ -278,36 +2552,23 @@ class RedactedAirways:
         - token: User authentication token
         - task_type: Type of task lists to retrieve ('task/list' or 'partners')
         - proxy: Optional proxy to use for request
+        - account: Account key used to pick the pooled session
         - retries: Number of retry attempts
         
         Returns:
         - Dictionary with task list data or None on failure
         """
-        base_url = 'https://quest.redactedairways.com/api/v1/'
-        url = f"{base_url}{task_type}"
-        
-        headers = {
-            **self.headers,
-            'Authorization': f'Bearer {token}'
-        }
+        url = f"{self.base_url}/api/v1/{task_type}"
         
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=30)) as session:
-                    async with session.get(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        return result
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    logger.warning(f"Attempt {attempt+1} failed for {task_type}. Retrying...")
-                    await asyncio.sleep(5)
-                    continue
-                logger.error(f"Failed to get {task_type} tasks: {e}")
-                return None
+        try:
+            return await self.request("GET", url, token, proxy, account, retries=retries, timeout=30)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"{account}: failed to get {task_type} tasks: {e}")
+            return None
 
-    async def claim_task(self, token: str, task_id: str, proxy=None, retries=3):
+    async def claim_task(self, token: str, task_id: str, proxy=None, account=None, retries=3):
         """
         Claims a task for the user
         
@@ -315,40 +2576,30 @@ class RedactedAirways:
         - token: User authentication token
         - task_id: ID of the task to claim
         - proxy: Optional proxy to use for request
+        - account: Account key used to pick the pooled session
         - retries: Number of retry attempts
         
         Returns:
         - True if task was claimed successfully, False otherwise
         """
-        url = f'https://quest.redactedairways.com/api/v1/task/claim/{task_id}'
-        headers = {
-            **self.headers,
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        url = f'{self.base_url}/api/v1/task/claim/{task_id}'
+        headers = {'Content-Type': 'application/json'}
         
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=20)) as session:
-                    async with session.post(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        success = result.get("success", False)
-                        if success:
-                            logger.info(f"Successfully claimed task {task_id}")
-                            return True
-                        else:
-                            logger.warning(f"Failed to claim task {task_id}: {result.get('message', 'Unknown error')}")
-                            return False
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                logger.error(f"Error claiming task {task_id}: {e}")
-                return False
+        try:
+            result = await self.request("POST", url, token, proxy, account, retries=retries, headers=headers)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"{account}: error claiming task {task_id}: {e}")
+            return False
 
-    async def complete_task(self, token: str, task_id: str, proxy=None, retries=3):
+        if result.get("success", False):
+            logger.info(f"{account}: claimed task {task_id}")
+            return True
+        logger.warning(f"{account}: failed to claim task {task_id}: {result.get('message', 'Unknown error')}")
+        return False
+
+    async def complete_task(self, token: str, task_id: str, proxy=None, account=None, retries=3):
         """
         Marks a task as completed
         
@@ -356,40 +2607,31 @@ class RedactedAirways:
         - token: User authentication token
         - task_id: ID of the task to complete
         - proxy: Optional proxy to use for request
+        - account: Account key used to pick the pooled session
         - retries: Number of retry attempts
         
         Returns:
         - Task completion data or None on failure
         """
-        url = f'https://quest.redactedairways.com/api/v1/task/complete/{task_id}'
-        headers = {
-            **self.headers,
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        url = f'{self.base_url}/api/v1/task/complete/{task_id}'
+        headers = {'Content-Type': 'application/json'}
         
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=20)) as session:
-                    async with session.post(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        if result.get("success", False):
-                            points_earned = result.get("data", {}).get("score", 0)
-                            logger.info(f"Task {task_id} completed! Earned {points_earned} points")
-                            return result.get("data")
-                        else:
-                            logger.warning(f"Task completion failed: {result.get('message', 'Unknown error')}")
-                            return None
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                logger.error(f"Error completing task {task_id}: {e}")
-                return None
+        try:
+            result = await self.request("POST", url, token, proxy, account, retries=retries, headers=headers)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"{account}: error completing task {task_id}: {e}")
+            return None
 
-    async def claim_partner_reward(self, token: str, partner_id: str, proxy=None, retries=3):
+        if result.get("success", False):
+            points_earned = result.get("data", {}).get("score", 0)
+            logger.info(f"{account}: task {task_id} completed, earned {points_earned} points")
+            return result.get("data")
+        logger.warning(f"{account}: task {task_id} completion failed: {result.get('message', 'Unknown error')}")
+        return None
+
+    async def claim_partner_reward(self, token: str, partner_id: str, proxy=None, account=None, retries=3):
         """
         Claims a reward from a partner task
         
@@ -397,214 +2639,565 @@ class RedactedAirways:
         - token: User authentication token
         - partner_id: ID of the partner task
         - proxy: Optional proxy to use for request
+        - account: Account key used to pick the pooled session
         - retries: Number of retry attempts
         
         Returns:
         - Reward data or None on failure
         """
-        url = f'https://quest.redactedairways.com/api/v1/partners/claim/{partner_id}'
-        headers = {
-            **self.headers,
-            'Authorization': f'Bearer {token}',
-            'Content-Type': 'application/json'
-        }
+        url = f'{self.base_url}/api/v1/partners/claim/{partner_id}'
+        headers = {'Content-Type': 'application/json'}
         
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=20)) as session:
-                    async with session.post(url=url, headers=headers) as response:
-                        response.raise_for_status()
-                        result = await response.json()
-                        if result.get("success", False):
-                            points_earned = result.get("data", {}).get("score", 0)
-                            logger.info(f"Partner reward {partner_id} claimed! Earned {points_earned} points")
-                            return result.get("data")
-                        else:
-                            logger.warning(f"Partner reward claim failed: {result.get('message', 'Unknown error')}")
-                            return None
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                logger.error(f"Error claiming partner reward {partner_id}: {e}")
+        try:
+            result = await self.request("POST", url, token, proxy, account, retries=retries, headers=headers)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            logger.error(f"{account}: error claiming partner reward {partner_id}: {e}")
+            return None
+
+        if result.get("success", False):
+            points_earned = result.get("data", {}).get("score", 0)
+            logger.info(f"{account}: partner reward {partner_id} claimed, earned {points_earned} points")
+            return result.get("data")
+        logger.warning(f"{account}: partner reward {partner_id} claim failed: {result.get('message', 'Unknown error')}")
+        return None
+
+    def pending_tasks(self, username, task_lists):
+        """
+        Returns tasks that still need a claim or completion, clearing
+        journal claims of tasks the API already reports as completed
+        """
+        pending = []
+        for task in (task_lists or {}).get("list", []):
+            if not task:
+                continue
+            if task.get("status") in ("NOT_STARTED", "CLAIMED"):
+                pending.append(task)
+            elif task.get("status") == "COMPLETED":
+                self.journal.mark_completed(username, task.get("id"))
+        return pending
+
+    def pending_partners(self, username, partner_lists):
+        """
+        Returns partner rewards that are still unclaimed
+        """
+        return [
+            partner for partner in (partner_lists or {}).get("data", [])
+            if partner and partner.get("status") == "NOT_CLAIMED"
+        ]
+
+    async def run_task(self, token, task, proxy=None, account=None):
+        """
+        Claims (if needed) and completes one task
+
+        Returns the points earned, or None if the task could not be finished.
+        """
+        task_id = task.get("id")
+        task_title = task.get("title", "Unknown Task")
+        task_points = task.get("expected_score", 0)
+
+        if task.get("status") == "NOT_STARTED":
+            # The server's status wins: a claim it reports as not started was
+            # reset or never landed, so it is claimed again
+            self.journal.mark_released(account, task_id)
+            claim_result = await self.claim_task(token, task_id, proxy, account)
+            if not claim_result:
+                logger.warning(f"{account}: failed to claim task: {task_title}")
                 return None
+            self.journal.mark_claimed(account, task_id)
+
+        complete_result = await self.complete_task(token, task_id, proxy, account)
+        if not complete_result:
+            logger.warning(f"{account}: failed to complete task: {task_title}")
+            return None
+        self.journal.mark_completed(account, task_id)
+        logger.info(f"{account}: completed task: {task_title} (+{task_points} points)")
+        return complete_result.get("score", task_points) if isinstance(complete_result, dict) else task_points
+
+    async def run_partner(self, token, partner, proxy=None, account=None):
+        """
+        Claims one partner reward
+
+        Returns the points earned, or None if the reward could not be claimed.
+        """
+        partner_id = partner.get("id")
+        partner_name = partner.get("name", "Unknown Partner")
+        partner_points = partner.get("expected_score", 0)
+
+        claim_result = await self.claim_partner_reward(token, partner_id, proxy, account)
+        if not claim_result:
+            logger.warning(f"{account}: failed to claim partner reward: {partner_name}")
+            return None
+        logger.info(f"{account}: claimed partner reward: {partner_name} (+{partner_points} points)")
+        return claim_result.get("score", partner_points) if isinstance(claim_result, dict) else partner_points
 
     async def process_accounts(self, token: str, username: str, use_proxy):
         proxy = self.get_next_proxy_for_account(username) if use_proxy else None
-        new_token = None
-
-        with Progress(
-            SpinnerColumn(),
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn()
-        ) as progress:
-            main_task = progress.add_task(f"[cyan]Processing account: {username}", total=100)
 
-            # Token validation
-            is_valid = await self.user_auth(token, proxy)
+        # Token validation, skipped while the JWT is clearly still valid
+        if username in self.refreshing:
+            await asyncio.shield(self.refreshing[username])
+        active_token = self.current_token(username, token)
+        if not self.token_is_fresh(active_token):
+            is_valid = await self.user_auth(active_token, proxy, username)
             if not is_valid:
-                logger.warning("Token expired - attempting revalidation")
-                new_token = await self.revalidate_token(token, proxy)
+                logger.warning(f"{username}: token expired - attempting revalidation")
+                new_token = await self.refresh_token(username, self.current_token(username, token), proxy)
                 if not new_token:
-                    logger.error("Token revalidation failed")
+                    logger.error(f"{username}: token revalidation failed")
+                    return False
+                logger.info(f"{username}: token revalidation successful")
+            active_token = self.current_token(username, token)
+
+        summary = {
+            "username": username,
+            "balance": None,
+            "tasks_completed": 0,
+            "partners_claimed": 0,
+            "failed": 0,
+            "points": 0
+        }
+        lists_ok = True
+        info = None
+        blocked = None
+
+        # Tasks and partner rewards run concurrently under a per-account limit;
+        # each task still goes claim -> complete in order
+        semaphore = asyncio.Semaphore(self.account_concurrency)
+
+        async def run(counter, item_job, item):
+            nonlocal blocked
+            async with semaphore:
+                if blocked is not None:
                     return
-                self.save_new_token(token, new_token)
-                logger.info("Token revalidation successful")
-
-            active_token = new_token if new_token else token
-            progress.update(main_task, completed=20)
-
-            # User info and balance
-            user = await self.user_info(active_token, proxy)
-            balance = user.get("overall_score", 0) if user else "N/A"
-            logger.info(f"Current balance: {balance} Points")
-            progress.update(main_task, completed=40)
-
-            # Process tasks
-            task_types = ["task/list", "partners"]
-            for task_type in task_types:
-                task_progress = progress.add_task(
-                    f"[yellow]Processing {task_type}...",
-                    total=100
-                )
-                
-                task_lists = await self.task_lists(active_token, task_type, proxy)
-                if task_lists:
-                    if task_type == "task/list":
-                        tasks = task_lists.get("list", [])
-                        total_tasks = len(tasks)
-                        for idx, task in enumerate(tasks, 1):
-                            if task:
-                                task_id = task.get("id")
-                                task_title = task.get("title", "Unknown Task")
-                                task_status = task.get("status")
-                                task_points = task.get("expected_score", 0)
-                                
-                                progress.update(
-                                    task_progress, 
-                                    description=f"[yellow]Processing task {idx}/{total_tasks}: {task_title}"
-                                )
-                                
-                                if task_status == "NOT_STARTED":
-                                    # Claim task
-                                    claim_result = await self.claim_task(active_token, task_id, proxy)
-                                    if claim_result:
-                                        # Complete task
-                                        complete_result = await self.complete_task(active_token, task_id, proxy)
-                                        if complete_result:
-                                            logger.info(f"Completed task: {task_title} (+{task_points} points)")
-                                        else:
-                                            logger.warning(f"Failed to complete task: {task_title}")
-                                    else:
-                                        logger.warning(f"Failed to claim task: {task_title}")
-                                elif task_status == "CLAIMED":
-                                    # Task already claimed, complete it
-                                    complete_result = await self.complete_task(active_token, task_id, proxy)
-                                    if complete_result:
-                                        logger.info(f"Completed task: {task_title} (+{task_points} points)")
-                                    else:
-                                        logger.warning(f"Failed to complete task: {task_title}")
-                                elif task_status == "COMPLETED":
-                                    logger.info(f"Task already completed: {task_title}")
-                                    
-                                progress.update(task_progress, completed=(idx/total_tasks)*100)
-                                await asyncio.sleep(5)
-                    elif task_type == "partners":
-                        partners = task_lists.get("data", [])
-                        total_partners = len(partners)
-                        for idx, partner in enumerate(partners, 1):
-                            if partner:
-                                partner_id = partner.get("id")
-                                partner_name = partner.get("name", "Unknown Partner")
-                                partner_status = partner.get("status")
-                                partner_points = partner.get("expected_score", 0)
-                                
-                                progress.update(
-                                    task_progress, 
-                                    description=f"[yellow]Processing partner {idx}/{total_partners}: {partner_name}"
-                                )
-                                
-                                if partner_status == "NOT_CLAIMED":
-                                    # Claim partner reward
-                                    claim_result = await self.claim_partner_reward(active_token, partner_id, proxy)
-                                    if claim_result:
-                                        logger.info(f"Claimed partner reward: {partner_name} (+{partner_points} points)")
-                                    else:
-                                        logger.warning(f"Failed to claim partner reward: {partner_name}")
-                                elif partner_status == "CLAIMED":
-                                    logger.info(f"Partner reward already claimed: {partner_name}")
-                                    
-                                progress.update(task_progress, completed=(idx/total_partners)*100)
-                                await asyncio.sleep(5)
-                else:
-                    logger.error(f"No data available for {task_type}")
-                
-                progress.update(main_task, completed=70 if task_type == "task/list" else 100)
+                try:
+                    points = await item_job(active_token, item, proxy, username)
+                except CircuitOpenError as e:
+                    blocked = e
+                    return
+            if points is None:
+                summary["failed"] += 1
+            else:
+                summary["points"] += points
+                summary[counter] += 1
+
+        # Both lists are fetched at once and each one starts its own items as
+        # soon as it arrives; user info is only fetched once there is work,
+        # alongside it
+        async def pipeline(task_type, pending, counter, item_job):
+            nonlocal lists_ok, info
+            result = await self.task_lists(active_token, task_type, proxy, username)
+            if not result:
+                lists_ok = False
+                logger.error(f"{username}: no data available for {task_type}")
+            items = pending(username, result)
+            if items and info is None:
+                info = asyncio.ensure_future(self.user_info(active_token, proxy, username))
+            await asyncio.gather(*(run(counter, item_job, item) for item in items))
+
+        try:
+            for result in await asyncio.gather(
+                pipeline("task/list", self.pending_tasks, "tasks_completed", self.run_task),
+                pipeline("partners", self.pending_partners, "partners_claimed", self.run_partner),
+                return_exceptions=True
+            ):
+                if isinstance(result, BaseException):
+                    raise result
+            # An open breaker stops the account; the scheduler requeues it
+            if blocked is not None:
+                raise blocked
+            if info is None:
+                logger.info(f"No new tasks for {username}")
+                return summary if lists_ok else False
+            user = await info
+        finally:
+            if info is not None and not info.done():
+                info.cancel()
+
+        balance = user.get("overall_score", 0) if user else "N/A"
+        summary["balance"] = balance
+        logger.info(f"{username}: current balance {balance} points")
+
+        logger.info(
+            f"{username}: {summary['tasks_completed']} tasks completed, "
+            f"{summary['partners_claimed']} partner rewards claimed, "
+            f"{summary['failed']} failed (+{summary['points']} points)"
+        )
+        # A failed list fetch may have hidden work, so retry the account soon
+        return summary if lists_ok else False
+
+    async def start_metrics(self):
+        """
+        Starts the loop lag monitor and the optional metrics endpoint and
+        snapshot writer, returning objects to clean up at shutdown
+        """
+        self.loop_lag_task = asyncio.create_task(self.loop_lag.run())
+        runner = snapshots = None
+        if self.metrics_port:
+            runner = await self.metrics.serve(port=self.metrics_port)
+        if self.metrics_path:
+            snapshots = asyncio.create_task(self.metrics.write_snapshots(self.metrics_path, self.metrics_interval))
+        return runner, snapshots
+
+    async def stop_metrics(self, runner, snapshots):
+        if self.loop_lag_task is not None:
+            self.loop_lag_task.cancel()
+            self.loop_lag_task = None
+        if snapshots is not None:
+            snapshots.cancel()
+        if self.metrics_path:
+            write_atomic(self.metrics_path, json.dumps(self.metrics.snapshot(), separators=(",", ":")))
+        if runner is not None:
+            await runner.cleanup()
+
+    async def run_accounts(self, accounts, use_proxy, on_result=None):
+        """
+        Runs the rolling scheduler over `accounts` in this process
+        """
+        async def job(token, username):
+            self.active_accounts.add(username)
+            try:
+                return await self.process_accounts(token, username, use_proxy)
+            except CircuitOpenError as e:
+                if e.proxy is not None:
+                    # The account's proxy is down, not the API: move the
+                    # account to another proxy and retry it soon
+                    self.rotate_proxy_for_account(username)
+                    e.retry_in = 1.0
+                raise
+            finally:
+                self.active_accounts.discard(username)
+                await self.sessions.release(username)
+
+        with FleetProgress(len(self.token_store), self.interactive and on_result is None) as fleet:
+            report = on_result or fleet.advance
+
+            def finished(username, result):
+                with self.phase("progress"):
+                    report(username, result)
+                if self.profiler is not None:
+                    self.profiler.account_finished(username, result)
+
+            if self.profiler is not None:
+                self.profiler.start(len(self.token_store))
+            scheduler = self.scheduler = RollingScheduler(
+                job,
+                concurrency=self.concurrency,
+                metrics=self.metrics,
+                on_result=finished,
+                interval=self.run_interval,
+                retry_interval=self.retry_interval,
+                once=self.once,
+                journal=self.journal,
+                tokens=self.token_store
+            )
+            await scheduler.run(accounts)
+            if self.once:
+                self.journal.end_cycle()
+
+    def worker_options(self, index):
+        """
+        Constructor options for shard worker `index`; the host rate limit is
+        split between workers so the fleet-wide ceiling stays the same
+        """
+        share = self.workers
+        metrics_path = log_file = record = profile = cprofile = None
+        if self.metrics_path:
+            root, ext = os.path.splitext(self.metrics_path)
+            metrics_path = f"{root}.worker{index}{ext}"
+        if self.log_file:
+            root, ext = os.path.splitext(self.log_file)
+            log_file = f"{root}.worker{index}{ext}"
+        if self.cassette is not None and not self.cassette.replaying:
+            record = f"{self.cassette.path}.worker{index}"
+        if self.profiler is not None:
+            root, ext = os.path.splitext(self.profiler.path)
+            profile = f"{root}.worker{index}{ext}"
+            if self.profiler.cprofile_path:
+                root, ext = os.path.splitext(self.profiler.cprofile_path)
+                cprofile = f"{root}.worker{index}{ext}"
+        return {
+            "concurrency": self.concurrency,
+            "account_concurrency": self.account_concurrency,
+            "rate_limit": self.rate_limiter.rate / share,
+            "burst": max(1, self.rate_limiter.burst // share),
+            "endpoint_limits": {
+                endpoint: (rate / share, max(1, burst // share))
+                for endpoint, (rate, burst) in self.rate_limiter.endpoint_limits.items()
+            },
+            "base_url": self.base_url,
+            "metrics_path": metrics_path,
+            "metrics_interval": self.metrics_interval,
+            "interactive": False,
+            "run_interval": self.run_interval,
+            "retry_interval": self.retry_interval,
+            "once": self.once,
+            "log_format": self.log_format,
+            "log_file": log_file,
+            "record": record,
+            "replay": self.cassette.path if self.cassette is not None and self.cassette.replaying else None,
+            "replay_speed": self.cassette.speed if self.cassette is not None else 1.0,
+            "profile": profile,
+            "cprofile": cprofile,
+            "runtime": self.runtime
+        }
+
+    async def run_sharded(self, use_proxy):
+        """
+        Splits the accounts across worker processes and collects their token
+        refreshes and per-account results
+        """
+        context = multiprocessing.get_context("spawn")
+        events = context.Queue()
+
+        proxy_urls = []
+        if use_proxy:
+            proxy_urls = self.proxy_checker.ranked() or [record.url for record in self.proxies]
+
+        # The journal stays with this process, keyed by account, so resume
+        # state survives a change of --workers; each worker gets the entries
+        # of its own accounts and sends new ones back
+        journal_entries = {index: [] for index in range(self.workers)}
+        for entry in self.journal.snapshot():
+            journal_entries[shard_of(entry[1], self.workers)].append(entry)
+
+        processes = {
+            index: context.Process(
+                target=run_worker,
+                args=(
+                    (index, self.workers), self.worker_options(index), self.token_store.source,
+                    proxy_urls, events, journal_entries.pop(index)
+                ),
+                daemon=True
+            )
+            for index in range(self.workers)
+        }
+        for process in processes.values():
+            process.start()
+        logger.info(f"Started {len(processes)} worker processes")
+
+        loop = asyncio.get_running_loop()
+        running = set(processes)
+        cycle_ended = set()
+        try:
+            with FleetProgress(len(self.token_store), self.interactive) as fleet:
+                while running:
+                    event = await loop.run_in_executor(None, self.poll_event, events)
+                    if event is None:
+                        for index in list(running):
+                            if not processes[index].is_alive():
+                                logger.error(f"Worker {index} exited with code {processes[index].exitcode}")
+                                running.discard(index)
+                        continue
+                    kind = event[0]
+                    if kind == "token":
+                        self.token_store.update(event[1], event[2])
+                    elif kind == "journal":
+                        self.journal.append(*event[1])
+                    elif kind == "cycle_end":
+                        cycle_ended.add(event[1])
+                        if len(cycle_ended) == self.workers:
+                            self.journal.end_cycle()
+                    elif kind == "result":
+                        fleet.advance(event[1], event[2])
+                    elif kind == "done":
+                        running.discard(event[1])
+        finally:
+            for process in processes.values():
+                if process.is_alive():
+                    process.terminate()
+                process.join(timeout=5)
+
+    @staticmethod
+    def poll_event(events, timeout=1.0):
+        try:
+            return events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def load_state(self):
+        """
+        Loads the checkpoint journal; replays keep all state in memory so
+        they never touch the real files
+        """
+        if self.cassette is not None and self.cassette.replaying:
+            self.cassette.load()
+            self.token_store.path = self.journal.path = None
+            logger.info(f"Replaying {len(self.cassette.entries)} recorded responses from {self.cassette.path}")
+            return
+        self.journal.load()
+
+    async def run_shard(self, shard, source, proxy_urls, events, journal_entries=()):
+        """
+        Worker process side of run_sharded: streams the accounts of one
+        shard from `source` and reports back through `events`
+
+        The checkpoint journal is kept in memory, seeded with
+        `journal_entries` and mirrored to the main process, which owns the
+        file.
+        """
+        index = shard[0]
+        self.token_store.path = None
+        self.token_store.shard = shard
+        self.token_store.load(source)
+        self.journal.path = None
+        self.load_state()
+        for entry in journal_entries:
+            self.journal.apply(entry)
+        self.journal.on_append = lambda entry: events.put(("journal", entry))
+        for url in proxy_urls:
+            self.proxies.add_line(url)
+        use_proxy = bool(proxy_urls)
+        self.on_token_refresh = lambda username, token: events.put(("token", username, token))
+
+        metrics_runner, metrics_snapshots = await self.start_metrics()
+        token_refresher = asyncio.create_task(self.keep_tokens_fresh(use_proxy))
+        try:
+            await self.run_accounts(
+                self.token_store.accounts(), use_proxy,
+                on_result=lambda username, result: events.put(("result", username, result))
+            )
+            if self.once:
+                events.put(("cycle_end", index))
+        finally:
+            token_refresher.cancel()
+            if self.profiler is not None:
+                self.profiler.close()
+            await self.stop_metrics(metrics_runner, metrics_snapshots)
+            await self.journal.close()
+            await self.sessions.close()
+            if self.cassette is not None:
+                self.cassette.save()
+            events.put(("done", index))
 
     async def main(self):
+        proxy_monitor = token_refresher = None
+        metrics_runner, metrics_snapshots = await self.start_metrics()
         try:
-            with open('data.txt', 'r') as file:
-                tokens = [line.strip() for line in file if line.strip()]
+            self.token_store.load()
+            self.load_state()
 
-            use_proxy_choice = self.print_question()
+            use_proxy_choice = self.proxy_choice()
             use_proxy = use_proxy_choice in [1, 2]
             
             if use_proxy:
                 await self.load_proxies(use_proxy_choice)
-                self.console.print(self.create_proxy_table())
+                if self.interactive:
+                    self.console.print(self.create_proxy_table())
+                else:
+                    logger.info("Proxy types: " + ", ".join(
+                        f"{proxy_type}={count}" for proxy_type, count in self.proxies.counts.items()
+                    ))
+                if self.proxy_checker.ranked() or self.proxy_checker.candidates:
+                    proxy_monitor = asyncio.create_task(self.proxy_checker.monitor(self.wanted_proxies))
 
-            while True:
+            if self.interactive:
                 self.clear_terminal()
                 self.welcome()
-                logger.info(f"Processing {len(tokens)} accounts")
-
-                with ThreadPoolExecutor(max_workers=3) as executor:
-                    tasks = []
-                    for token in tokens:
-                        if token:
-                            username = self.decode_token(token)
-                            if username:
-                                task = self.process_accounts(token, username, use_proxy)
-                                tasks.append(task)
-                    
-                    await asyncio.gather(*tasks)
-
-                logger.info("All accounts processed. Starting countdown...")
-                
-                seconds = 12 * 60 * 60
-                with Progress(
-                    SpinnerColumn(),
-                    TextColumn("[progress.description]{task.description}"),
-                    BarColumn(),
-                    TaskProgressColumn(),
-                    transient=True
-                ) as progress:
-                    countdown = progress.add_task(
-                        "[cyan]Time until next run",
-                        total=seconds
-                    )
-                    while seconds > 0:
-                        formatted_time = self.format_seconds(seconds)
-                        progress.update(
-                            countdown,
-                            completed=seconds,
-                            description=f"[cyan]Next run in: {formatted_time}"
-                        )
-                        await asyncio.sleep(1)
-                        seconds -= 1
-                        progress.update(countdown, completed=seconds)
+            logger.info(f"Processing {len(self.token_store)} accounts")
+
+            if self.workers > 1:
+                await self.run_sharded(use_proxy)
+            else:
+                token_refresher = asyncio.create_task(self.keep_tokens_fresh(use_proxy))
+                await self.run_accounts(self.token_store.accounts(), use_proxy)
 
         except FileNotFoundError:
             logger.error("File 'data.txt' Not Found.")
             return
         except Exception as e:
             logger.error(f"Error: {e}", exc_info=True)
+        finally:
+            for task in (proxy_monitor, token_refresher):
+                if task is not None:
+                    task.cancel()
+            if self.profiler is not None:
+                self.profiler.close()
+            await self.stop_metrics(metrics_runner, metrics_snapshots)
+            await self.token_store.close()
+            await self.journal.close()
+            await self.sessions.close()
+            if self.cassette is not None:
+                self.cassette.save()
+
+def run_worker(shard, options, source, proxy_urls, events, journal_entries=()):
+    """
+    Entry point of a shard worker process
+    """
+    configure_logging(options.get("log_format", "plain"), log_file=options.get("log_file"))
+    configure_runtime(options.get("runtime", "fast"))
+    bot = RedactedAirways(**options)
+    try:
+        run_async(bot.run_shard(shard, source, proxy_urls, events, journal_entries), bot.runtime)
+    except KeyboardInterrupt:
+        pass
+
+def parse_args(argv=None):
+    """
+    Reads options from the command line and an optional JSON config file;
+    command line options take precedence over the config file
+    """
+    parser = argparse.ArgumentParser(description="RedactedAirways Quests - BOT")
+    parser.add_argument("--config", help="JSON config file with any of the options below")
+    parser.add_argument("--proxy", choices=sorted(RedactedAirways.PROXY_MODES), help="proxy mode; skips the question")
+    parser.add_argument("--headless", action="store_true", default=None,
+                        help="non-interactive: no prompts, no live progress, structured logs")
+    parser.add_argument("--log-format", choices=["rich", "plain", "json"])
+    parser.add_argument("--log-file", help="also append logs to this file as JSON lines")
+    parser.add_argument("--concurrency", type=int, help="accounts processed at once")
+    parser.add_argument("--account-concurrency", type=int, help="task requests in flight per account")
+    parser.add_argument("--rate-limit", type=float, help="requests per second to the Quest API")
+    parser.add_argument("--burst", type=int, help="rate limiter burst size")
+    parser.add_argument("--metrics-port", type=int, help="serve Prometheus metrics on this port")
+    parser.add_argument("--metrics-path", help="write periodic JSON metric snapshots to this file")
+    parser.add_argument("--base-url", help="Quest API base URL, e.g. a local mock_server.py")
+    parser.add_argument("--run-interval", type=float, help="seconds between runs of the same account")
+    parser.add_argument("--retry-interval", type=float, help="seconds before retrying an account whose run failed")
+    parser.add_argument("--once", action="store_true", default=None, help="run every account once and exit")
+    parser.add_argument("--workers", type=int, help="split accounts across this many worker processes")
+    parser.add_argument("--record", metavar="CASSETTE", help="record API responses to this .jsonl.gz cassette")
+    parser.add_argument("--replay", metavar="CASSETTE", help="serve API responses from a recorded cassette, offline")
+    parser.add_argument("--replay-speed", type=float,
+                        help="replay latency divisor: 1 is real time, 10 ten times faster, 0 instant")
+    parser.add_argument("--profile", metavar="REPORT",
+                        help="append per-cycle phase timings and event loop lag to this .jsonl report")
+    parser.add_argument("--cprofile", metavar="STATS",
+                        help="run the first cycle under cProfile and dump its stats to this file")
+    parser.add_argument("--runtime", choices=["fast", "stdlib"],
+                        help="'fast' uses uvloop and orjson when installed (default), 'stdlib' never does")
+    args = parser.parse_args(argv)
+
+    options = {}
+    if args.config:
+        with open(args.config, 'r') as file:
+            options.update({key.replace("-", "_"): value for key, value in json.load(file).items()})
+    options.update({key: value for key, value in vars(args).items() if value is not None and key != "config"})
+
+    unknown = set(options) - (set(vars(args)) - {"config"})
+    if unknown:
+        parser.error(f"unknown config options: {', '.join(sorted(unknown))}")
+    if options.get("proxy") not in (None, *RedactedAirways.PROXY_MODES):
+        parser.error(f"invalid proxy mode: {options['proxy']}")
+    if options.get("log_format") not in (None, "rich", "plain", "json"):
+        parser.error(f"invalid log format: {options['log_format']}")
+    if options.get("record") and options.get("replay"):
+        parser.error("--record and --replay cannot be combined")
+    if options.get("runtime") not in (None, "fast", "stdlib"):
+        parser.error(f"invalid runtime: {options['runtime']}")
+    return options
 
 if __name__ == "__main__":
     try:
-        bot = RedactedAirways()
-        asyncio.run(bot.main())
+        options = parse_args()
+        headless = options.pop("headless", False)
+        log_format = options.pop("log_format", "plain" if headless else "rich")
+        configure_logging(log_format, log_file=options.get("log_file"))
+        backends = configure_runtime(options.get("runtime", "fast"))
+        logger.debug(f"Runtime: {backends['loop']} event loop, {backends['json']} decoder")
+        bot = RedactedAirways(
+            interactive=not headless, proxy_mode=options.pop("proxy", None), log_format=log_format, **options
+        )
+        run_async(bot.main(), bot.runtime)
     except KeyboardInterrupt:
         logger.info("Bot stopped by user")
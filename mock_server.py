@@ -0,0 +1,217 @@
+from aiohttp import web
+import argparse, asyncio, base64, json, random, time
+
+def make_token(username: str, ttl=3600):
+    """
+    Builds an unsigned JWT-shaped token carrying `user_name` and `exp`
+    """
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+    header = encode({"alg": "none", "typ": "JWT"})
+    payload = encode({"user_name": username, "exp": int(time.time() + ttl)})
+    return f"{header}.{payload}.mock"
+
+def read_token(token: str):
+    try:
+        header, payload, signature = token.split(".")
+        return json.loads(base64.urlsafe_b64decode(payload + "==").decode("utf-8"))
+    except Exception:
+        return None
+
+class MockQuestServer:
+    """
+    Local stand-in for the Quest API with configurable latency and faults
+
+    Parameters:
+    - latency: Mean added latency per request in seconds
+    - jitter: Uniform +/- jitter applied to the latency
+    - error_rate: Probability of answering 500
+    - unauthorized_rate: Probability of answering 401 (besides expired tokens)
+    - rate_limited_rate: Probability of answering 429 with Retry-After
+    - retry_after: Retry-After value sent with injected 429s
+    - tasks: Number of tasks per account
+    - partners: Number of partner rewards per account
+    - token_ttl: Lifetime in seconds of tokens issued by revalidate
+    """
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, unauthorized_rate=0.0,
+                 rate_limited_rate=0.0, retry_after=1, tasks=10, partners=5, token_ttl=3600, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.unauthorized_rate = unauthorized_rate
+        self.rate_limited_rate = rate_limited_rate
+        self.retry_after = retry_after
+        self.tasks = tasks
+        self.partners = partners
+        self.token_ttl = token_ttl
+        self.random = random.Random(seed)
+        self.accounts = {}
+        self.requests = 0
+        self.responses = {}
+
+    def account(self, username):
+        account = self.accounts.get(username)
+        if account is None:
+            account = self.accounts[username] = {
+                "score": 0,
+                "tasks": {str(i): "NOT_STARTED" for i in range(1, self.tasks + 1)},
+                "partners": {f"p{i}": "NOT_CLAIMED" for i in range(1, self.partners + 1)}
+            }
+        return account
+
+    def count(self, status):
+        self.responses[status] = self.responses.get(status, 0) + 1
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        self.requests += 1
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        roll = self.random.random()
+        if roll < self.error_rate:
+            self.count(500)
+            return web.json_response({"success": False, "message": "Injected error"}, status=500)
+        roll -= self.error_rate
+        if roll < self.rate_limited_rate:
+            self.count(429)
+            return web.json_response(
+                {"success": False, "message": "Too many requests"},
+                status=429, headers={"Retry-After": str(self.retry_after)}
+            )
+        roll -= self.rate_limited_rate
+
+        auth = request.headers.get("Authorization", "")
+        payload = read_token(auth[len("Bearer "):]) if auth.startswith("Bearer ") else None
+        if payload is None or "user_name" not in payload:
+            self.count(401)
+            return web.json_response({"success": False, "message": "Missing token"}, status=401)
+        request["username"] = payload["user_name"]
+
+        if request.path != "/ecom-gateway/revalidate":
+            expired = payload.get("exp") is not None and payload["exp"] < time.time()
+            if expired or roll < self.unauthorized_rate:
+                self.count(401)
+                return web.json_response({"success": False, "message": "Token expired"}, status=401)
+
+        response = await handler(request)
+        self.count(response.status)
+        return response
+
+    async def user_auth(self, request):
+        return web.json_response({"success": True})
+
+    async def user_info(self, request):
+        username = request["username"]
+        return web.json_response({
+            "success": True,
+            "data": {"user_name": username, "overall_score": self.account(username)["score"]}
+        })
+
+    async def task_list(self, request):
+        account = self.account(request["username"])
+        return web.json_response({
+            "success": True,
+            "list": [
+                {"id": task_id, "title": f"Task {task_id}", "status": status, "expected_score": 10}
+                for task_id, status in account["tasks"].items()
+            ]
+        })
+
+    async def partner_list(self, request):
+        account = self.account(request["username"])
+        return web.json_response({
+            "success": True,
+            "data": [
+                {"id": partner_id, "name": f"Partner {partner_id}", "status": status, "expected_score": 5}
+                for partner_id, status in account["partners"].items()
+            ]
+        })
+
+    async def claim_task(self, request):
+        account = self.account(request["username"])
+        task_id = request.match_info["task_id"]
+        if account["tasks"].get(task_id) != "NOT_STARTED":
+            return web.json_response({"success": False, "message": "Task cannot be claimed"})
+        account["tasks"][task_id] = "CLAIMED"
+        return web.json_response({"success": True})
+
+    async def complete_task(self, request):
+        account = self.account(request["username"])
+        task_id = request.match_info["task_id"]
+        if account["tasks"].get(task_id) != "CLAIMED":
+            return web.json_response({"success": False, "message": "Task is not claimed"})
+        account["tasks"][task_id] = "COMPLETED"
+        account["score"] += 10
+        return web.json_response({"success": True, "data": {"score": 10}})
+
+    async def claim_partner(self, request):
+        account = self.account(request["username"])
+        partner_id = request.match_info["partner_id"]
+        if account["partners"].get(partner_id) != "NOT_CLAIMED":
+            return web.json_response({"success": False, "message": "Reward already claimed"})
+        account["partners"][partner_id] = "CLAIMED"
+        account["score"] += 5
+        return web.json_response({"success": True, "data": {"score": 5}})
+
+    async def revalidate(self, request):
+        return web.json_response({"token": make_token(request["username"], self.token_ttl)})
+
+    def create_app(self):
+        app = web.Application(middlewares=[self.middleware])
+        app.add_routes([
+            web.get("/api/v1/user/auth", self.user_auth),
+            web.get("/api/v1/user/info", self.user_info),
+            web.get("/api/v1/task/list", self.task_list),
+            web.get("/api/v1/partners", self.partner_list),
+            web.post("/api/v1/task/claim/{task_id}", self.claim_task),
+            web.post("/api/v1/task/complete/{task_id}", self.complete_task),
+            web.post("/api/v1/partners/claim/{partner_id}", self.claim_partner),
+            web.post("/ecom-gateway/revalidate", self.revalidate),
+        ])
+        return app
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Starts the server in the running loop and returns its base URL
+        """
+        self.runner = web.AppRunner(self.create_app(), access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        bound_port = self.runner.addresses[0][1]
+        return f"http://{host}:{bound_port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock of the RedactedAirways Quest API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.05, help="mean added latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--unauthorized-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limited-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1)
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--partners", type=int, default=5)
+    parser.add_argument("--token-ttl", type=int, default=3600)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = MockQuestServer(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        unauthorized_rate=args.unauthorized_rate,
+        rate_limited_rate=args.rate_limited_rate,
+        retry_after=args.retry_after,
+        tasks=args.tasks,
+        partners=args.partners,
+        token_ttl=args.token_ttl
+    )
+    web.run_app(server.create_app(), host=args.host, port=args.port, access_log=None)